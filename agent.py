@@ -1,25 +1,40 @@
 # Import relevant functionality
 #from langchain.chat_models import init_chat_model
 from langchain_tavily import TavilySearch
-from langgraph.checkpoint.memory import MemorySaver
+from search_client import SearchFrontEnd
+from durable_checkpointer import PrunedSqliteSaver, retain_messages
+from agent_streaming import fan_out
 
-from langchain.agents import create_react_agent
-#from langgraph.prebuilt import create_react_agent
+from langgraph.prebuilt import create_react_agent
 from dotenv import load_dotenv
+import os
 
 load_dotenv()
 
 # Create the agent
-memory = MemorySaver()
+# Durable thread memory: survives restarts and keeps the newest checkpoints per thread
+memory = PrunedSqliteSaver.from_path(
+    os.getenv("AGENT_CHECKPOINT_DB", "agent_checkpoints.db"),
+    keep_last=int(os.getenv("AGENT_CHECKPOINT_KEEP", "20")),
+)
 from langchain_openai import ChatOpenAI
 
 model = ChatOpenAI(model="gpt-4o")
 #model = init_chat_model("anthropic:claude-3-5-sonnet-latest")
-search = TavilySearch(max_results=2)
+# Cached, coalesced and rate-limited so bursts of identical searches make one upstream call
+search = SearchFrontEnd(
+    TavilySearch(max_results=2),
+    rate=float(os.getenv("SEARCH_RATE_PER_SEC", "1")),
+    burst=int(os.getenv("SEARCH_BURST", "5")),
+).as_tool()
 tools = [search]
-agent_executor = create_react_agent(model, tools, checkpointer=memory)
+# Old turns are dropped from the thread state so checkpoints stay bounded too
+agent_executor = create_react_agent(
+    model, tools, checkpointer=memory,
+    pre_model_hook=retain_messages(int(os.getenv("AGENT_MAX_MESSAGES", "40"))),
+)
 # Use the agent
-config = {"configurable": {"thread_id": "abc123"}}
+config = {"configurable": {"thread_id": os.getenv("AGENT_THREAD_ID", "abc123")}}
 
 input_message = {
     "role": "user",
@@ -44,17 +59,15 @@ for step in agent_executor.stream(
     '''
 
 input_message = {"role": "user", "content": "Search for the weather in SF"}
-response = agent_executor.invoke({"messages": [input_message]}, config, stream_mode="values")
+
+# One graph execution feeds all three views (step values, tokens, final messages)
+response = fan_out(
+    agent_executor,
+    {"messages": [input_message]},
+    config,
+    on_value=lambda step: step["messages"][-1].pretty_print(),
+    on_token=lambda text, metadata: print(text, end="|"),
+)
 
 for message in response["messages"]:
     message.pretty_print()
-
-for step in agent_executor.stream({"messages": [input_message]}, config, stream_mode="values"):
-    step["messages"][-1].pretty_print()
-
-for step, metadata in agent_executor.stream(
-    {"messages": [input_message]}, config, stream_mode="messages"
-):
-    if metadata["langgraph_node"] == "agent" and (text := step.text()):
-        print(text, end="|")
-
@@ -0,0 +1,140 @@
+"""Run a file of agent queries concurrently and report latency per query.
+
+USAGE:
+    python agent_batch.py agent_queries.jsonl --agent 5 --concurrency 4
+
+Queries are read from a text file (one query per line) or a JSONL file with
+{"query": ..., "session": ...} objects. Queries without a session are
+independent and run concurrently. Queries that share a session run in file
+order against that session's ConversationMemory, because later questions
+depend on earlier answers.
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import time
+from pathlib import Path
+
+from agent_tools import get_tool_calls
+
+AGENT_MODULES = {
+    "4b": "building_first_agent_4b",
+    "5": "building_first_agent_5",
+}
+
+
+def load_queries(path) -> list:
+    """Read queries as {"query", "session"} dicts; blank lines and # comments are skipped."""
+    path = Path(path)
+    queries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if path.suffix == '.jsonl':
+                item = json.loads(line)
+                queries.append({'query': item['query'], 'session': item.get('session')})
+            else:
+                queries.append({'query': line, 'session': None})
+    return queries
+
+
+async def _run_one(agent, index, item, semaphore, memory=None, runner=None):
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            if memory is not None:
+                result, tools = await runner(item['query'], agent, memory)
+            else:
+                result = await agent.ainvoke({"messages": item['query']})
+                tools = get_tool_calls(result)
+            answer, error = result['messages'][-1].content, None
+        except Exception as e:
+            answer, tools, error = None, [], str(e)
+        latency = time.perf_counter() - start
+    return {
+        'index': index,
+        'query': item['query'],
+        'session': item.get('session'),
+        'latency': latency,
+        'tools': tools,
+        'answer': answer,
+        'error': error,
+    }
+
+
+async def _run_session(agent, items, semaphore, memory, runner):
+    # One query at a time: each turn needs the previous answer in memory
+    return [await _run_one(agent, index, item, semaphore, memory, runner) for index, item in items]
+
+
+async def run_batch(agent, queries: list, concurrency: int = 4, memory_factory=None, runner=None) -> list:
+    """Run queries with at most ``concurrency`` agent calls in flight.
+
+    ``queries`` holds strings or {"query", "session"} dicts. When
+    ``memory_factory(session)`` and an async ``runner(query, agent, memory)``
+    are given, session queries go through them in order; everything else is
+    sent straight to ``agent.ainvoke``. Results come back in input order.
+    """
+    items = [q if isinstance(q, dict) else {'query': q, 'session': None} for q in queries]
+    semaphore = asyncio.Semaphore(concurrency)
+    sessions = {}
+    tasks = []
+    for index, item in enumerate(items):
+        if item.get('session') is not None and memory_factory is not None:
+            sessions.setdefault(item['session'], []).append((index, item))
+        else:
+            tasks.append(_run_one(agent, index, item, semaphore))
+    for session, session_items in sessions.items():
+        tasks.append(_run_session(agent, session_items, semaphore, memory_factory(session), runner))
+
+    results = []
+    for outcome in await asyncio.gather(*tasks):
+        results.extend(outcome if isinstance(outcome, list) else [outcome])
+    return sorted(results, key=lambda r: r['index'])
+
+
+def print_report(results: list, wall_time: float = None):
+    """Print per-query latency and tools, plus batch totals."""
+    print(f"\n{'═' * 70}")
+    print("⏱️  BATCH REPORT")
+    print(f"{'═' * 70}")
+    for r in results:
+        session = f" [{r['session']}]" if r['session'] else ""
+        tools = ', '.join(r['tools']) if r['tools'] else 'None'
+        status = f"❌ {r['error']}" if r['error'] else f"🔧 {tools}"
+        print(f"{r['index'] + 1:>3}. {r['latency']:6.2f}s{session} {r['query'][:45]:<45} {status}")
+    if results:
+        total = sum(r['latency'] for r in results)
+        print(f"{'─' * 70}")
+        print(f"Queries: {len(results)}  Errors: {sum(1 for r in results if r['error'])}  "
+              f"Sum of latencies: {total:.2f}s" + (f"  Wall time: {wall_time:.2f}s" if wall_time else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run agent queries concurrently.")
+    parser.add_argument("queries", help="Text file (one query per line) or JSONL file")
+    parser.add_argument("--agent", choices=sorted(AGENT_MODULES), default="5")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--memory-file", default="agent_conversation_memory.db",
+                        help="SQLite memory database for session queries (agent 5)")
+    args = parser.parse_args()
+
+    module = importlib.import_module(AGENT_MODULES[args.agent])
+    memory_factory = runner = None
+    if hasattr(module, "arun_agent_with_memory"):
+        from conversation_memory import ConversationMemory
+        memory_factory = lambda session: ConversationMemory(args.memory_file, session_id=session)
+        runner = module.arun_agent_with_memory
+
+    start = time.perf_counter()
+    results = asyncio.run(run_batch(module.agent, load_queries(args.queries), args.concurrency,
+                                    memory_factory, runner))
+    print_report(results, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""Record agent runs once and replay them offline, deterministically.
+
+USAGE:
+    python agent_replay.py record --agent 5 --queries agent_queries.jsonl
+    python agent_replay.py replay --agent 5 --queries agent_queries.jsonl --model-latency 0.3
+
+Recording calls the real model (OPENAI_API_KEY) and the real tool endpoints
+and saves every model response and tool HTTP response to a cassette file.
+Replaying serves the same responses from the cassette with optional injected
+latency, so the agent loop, memory and tool wrappers can be benchmarked and
+regression-tested without a network.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import importlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, messages_from_dict, messages_to_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import agent_tools
+
+# ============================================================================
+# CASSETTE
+# ============================================================================
+
+class ReplayMissError(LookupError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+def _hash(payload) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+
+class Cassette:
+    """JSON file of recorded responses, keyed by a hash of the request.
+
+    A key can hold several responses (the same request made more than once);
+    they are served in recording order and the last one repeats.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.data = {'model': {}, 'http': {}}
+        self._cursors = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.data.update(json.load(f))
+
+    def add(self, kind: str, key: str, response):
+        with self._lock:
+            self.data[kind].setdefault(key, []).append(response)
+
+    def next(self, kind: str, key: str):
+        with self._lock:
+            responses = self.data[kind].get(key)
+            if not responses:
+                raise ReplayMissError(f"No recorded {kind} response for key {key}; re-record the cassette")
+            index = self._cursors.get((kind, key), 0)
+            self._cursors[(kind, key)] = index + 1
+            return responses[min(index, len(responses) - 1)]
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=1, ensure_ascii=False)
+
+# ============================================================================
+# FAKE CHAT MODELS
+# ============================================================================
+
+def _message_key(message) -> dict:
+    # Message ids are random per run (langgraph assigns uuids), so leave them out
+    return {
+        'type': message.type,
+        'content': message.content,
+        'tool_calls': [
+            {'name': c['name'], 'args': c['args'], 'id': c.get('id')}
+            for c in getattr(message, 'tool_calls', None) or []
+        ],
+        'tool_call_id': getattr(message, 'tool_call_id', None),
+    }
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model that records responses of ``inner`` or replays them.
+
+    In "record" mode every call goes to ``inner`` (with the bound tools) and
+    the response is stored in the cassette under a hash of the input
+    messages. In "replay" mode the stored response is returned after
+    sleeping ``latency`` seconds, and ``inner`` is not needed.
+    """
+
+    cassette: Any
+    mode: str = "replay"
+    inner: Optional[Any] = None
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay-chat-model"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=tools, **kwargs)
+
+    def _record_response(self, key, message: AIMessage) -> ChatResult:
+        self.cassette.add('model', key, messages_to_dict([message])[0])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _replayed(self, key) -> ChatResult:
+        message = messages_from_dict([self.cassette.next('model', key)])[0]
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _inner_model(self, kwargs):
+        tools = kwargs.pop('tools', None)
+        return self.inner.bind_tools(tools, **kwargs) if tools else self.inner
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        key = _hash([_message_key(m) for m in messages])
+        if self.mode == "record":
+            return self._record_response(key, self._inner_model(kwargs).invoke(messages, stop=stop))
+        time.sleep(self.latency)
+        return self._replayed(key)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        key = _hash([_message_key(m) for m in messages])
+        if self.mode == "record":
+            return self._record_response(key, await self._inner_model(kwargs).ainvoke(messages, stop=stop))
+        await asyncio.sleep(self.latency)
+        return self._replayed(key)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that returns ``responses`` in order, ignoring its input.
+
+    Useful as a stub for agent benchmarks: e.g. one AIMessage with a tool
+    call followed by a plain answer drives one full model -> tool -> model
+    turn of a ReAct agent. The script restarts after the last response.
+    """
+
+    responses: list
+    latency: float = 0.0
+    index: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-chat-model"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _next(self) -> ChatResult:
+        # Fresh copy each time: langgraph assigns ids to messages in place, and a
+        # reused instance would replace the earlier answer instead of appending
+        message = self.responses[self.index % len(self.responses)].model_copy(update={'id': None})
+        self.index += 1
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._next()
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._next()
+
+# ============================================================================
+# HTTP TRANSPORTS
+# ============================================================================
+
+def _request_key(request: httpx.Request) -> str:
+    params = sorted(request.url.params.multi_items())
+    return _hash([request.method, f"{request.url.scheme}://{request.url.host}{request.url.path}", params])
+
+
+def _serialize_response(response: httpx.Response) -> dict:
+    return {
+        'status_code': response.status_code,
+        'content_type': response.headers.get('content-type', ''),
+        'text': response.text,
+    }
+
+
+def _deserialize_response(data: dict, request: httpx.Request) -> httpx.Response:
+    return httpx.Response(
+        data['status_code'],
+        headers={'content-type': data['content_type']},
+        content=data['text'].encode('utf-8'),
+        request=request,
+    )
+
+
+class RecordingTransport(httpx.BaseTransport):
+    """Sends requests to the network and records the responses."""
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+        self.inner = httpx.HTTPTransport()
+
+    def handle_request(self, request):
+        response = self.inner.handle_request(request)
+        response.read()
+        self.cassette.add('http', _request_key(request), _serialize_response(response))
+        return response
+
+
+class AsyncRecordingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+        self.inner = httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request):
+        response = await self.inner.handle_async_request(request)
+        await response.aread()
+        self.cassette.add('http', _request_key(request), _serialize_response(response))
+        return response
+
+
+class ReplayTransport(httpx.BaseTransport):
+    """Serves recorded responses after ``latency`` seconds; never touches the network."""
+
+    def __init__(self, cassette: Cassette, latency: float = 0.0):
+        self.cassette = cassette
+        self.latency = latency
+
+    def handle_request(self, request):
+        time.sleep(self.latency)
+        return _deserialize_response(self.cassette.next('http', _request_key(request)), request)
+
+
+class AsyncReplayTransport(httpx.AsyncBaseTransport):
+    def __init__(self, cassette: Cassette, latency: float = 0.0):
+        self.cassette = cassette
+        self.latency = latency
+
+    async def handle_async_request(self, request):
+        await asyncio.sleep(self.latency)
+        return _deserialize_response(self.cassette.next('http', _request_key(request)), request)
+
+# ============================================================================
+# SESSION
+# ============================================================================
+
+@contextmanager
+def replay_session(cassette_path, mode: str = "replay", model=None,
+                   model_latency: float = 0.0, http_latency: float = 0.0):
+    """Patch the tool HTTP clients and yield a ReplayChatModel.
+
+    Tool caches are emptied and a throwaway geocode cache (seeded only from
+    the bundled city table) is used, so record and replay issue the same
+    requests regardless of local cache state. In record mode the cassette is
+    saved on exit.
+    """
+    cassette = Cassette(cassette_path)
+    if mode == "record":
+        if model is None:
+            raise ValueError("Recording needs the real chat model")
+        agent_tools.configure_transport(RecordingTransport(cassette), AsyncRecordingTransport(cassette))
+    else:
+        agent_tools.configure_transport(ReplayTransport(cassette, http_latency),
+                                        AsyncReplayTransport(cassette, http_latency))
+    agent_tools.clear_caches()
+    saved_geocode_cache = agent_tools.geocode_cache
+    with tempfile.TemporaryDirectory() as tmp:
+        agent_tools.geocode_cache = agent_tools.GeocodeCache(Path(tmp) / "geocode_cache.json", preload=True)
+        try:
+            yield ReplayChatModel(cassette=cassette, mode=mode, inner=model, latency=model_latency)
+            if mode == "record":
+                cassette.save()
+        finally:
+            agent_tools.geocode_cache = saved_geocode_cache
+            agent_tools.configure_transport()
+            agent_tools.clear_caches()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or replay agent runs.")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--agent", choices=["4b", "5"], default="5")
+    parser.add_argument("--queries", default="agent_queries.jsonl")
+    parser.add_argument("--cassette", default=None, help="Defaults to cassettes/agent_<agent>.json")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="Seconds added to each replayed model call")
+    parser.add_argument("--http-latency", type=float, default=0.0, help="Seconds added to each replayed HTTP call")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.mode == "replay":
+        # The agent modules build a ChatOpenAI at import time; it is never called in replay
+        os.environ.setdefault("OPENAI_API_KEY", "replay")
+    from langgraph.prebuilt import create_react_agent
+    from agent_batch import AGENT_MODULES, load_queries, print_report, run_batch
+    from conversation_memory import ConversationMemory
+
+    module = importlib.import_module(AGENT_MODULES[args.agent])
+    cassette_path = args.cassette or f"cassettes/agent_{args.agent}.json"
+    tools = [module.web_search, module.calculator, module.calculator_batch, module.get_weather]
+
+    with tempfile.TemporaryDirectory() as tmp, replay_session(
+            cassette_path, args.mode, model=module.model,
+            model_latency=args.model_latency, http_latency=args.http_latency) as model:
+        agent = create_react_agent(model, tools)
+        memory_factory = runner = None
+        if hasattr(module, "arun_agent_with_memory"):
+            # Fresh memory every run so prompts match the recording
+            memory_factory = lambda session: ConversationMemory(Path(tmp) / "memory.db", session_id=session)
+            runner = module.arun_agent_with_memory
+        start = time.perf_counter()
+        results = asyncio.run(run_batch(agent, load_queries(args.queries), args.concurrency,
+                                        memory_factory, runner))
+        print_report(results, time.perf_counter() - start)
+    if any(r['error'] for r in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
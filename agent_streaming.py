@@ -0,0 +1,80 @@
+from langchain_core.messages import AIMessageChunk, ToolMessage
+
+# ============================================================================
+# AGENT EVENT STREAMING
+# ============================================================================
+
+def chunk_text(chunk) -> str:
+    """Text of a message chunk whose content is a string or a list of blocks."""
+    content = chunk.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in content
+    )
+
+
+def iter_agent_events(agent, inputs: dict, config: dict = None):
+    """Run the agent graph once and yield events as they are produced.
+
+    Uses ``stream_mode=["messages", "values"]`` so a single execution yields:
+        {"type": "token", "text", "node"}         model tokens
+        {"type": "tool_call", "name", "node"}     a tool call being requested
+        {"type": "tool_result", "name", "content", "node"}
+        {"type": "values", "state"}               full graph state after each step
+    The last "values" event holds the final state (what ``invoke`` returns).
+    """
+    for mode, payload in agent.stream(inputs, config, stream_mode=["messages", "values"]):
+        if mode == "values":
+            yield {"type": "values", "state": payload}
+            continue
+        chunk, metadata = payload
+        node = metadata.get("langgraph_node")
+        if isinstance(chunk, AIMessageChunk):
+            for tool_chunk in chunk.tool_call_chunks or []:
+                if tool_chunk.get("name"):
+                    yield {"type": "tool_call", "name": tool_chunk["name"], "node": node}
+            text = chunk_text(chunk)
+            if text:
+                yield {"type": "token", "text": text, "node": node}
+        elif isinstance(chunk, ToolMessage):
+            yield {"type": "tool_result", "name": chunk.name, "content": chunk.content, "node": node}
+
+
+def _as_list(sinks) -> list:
+    if sinks is None:
+        return []
+    return list(sinks) if isinstance(sinks, (list, tuple)) else [sinks]
+
+
+def fan_out(agent, inputs: dict, config: dict = None, on_value=None, on_message=None,
+            on_token=None, token_node: str = "agent"):
+    """Run the agent graph once and feed every consumer from that single run.
+
+    Replaces separate ``invoke``, ``stream(stream_mode="values")`` and
+    ``stream(stream_mode="messages")`` calls, each of which would execute the
+    whole graph (model and tool calls) again. Each ``on_*`` argument is a
+    callable or a list of callables:
+        on_value(state)                 full state after every step
+        on_message(chunk, metadata)     every message chunk
+        on_token(text, metadata)        text tokens from ``token_node``
+    Returns the final state, i.e. what ``invoke`` would have returned.
+    """
+    value_sinks, message_sinks, token_sinks = _as_list(on_value), _as_list(on_message), _as_list(on_token)
+    final_state = None
+    for mode, payload in agent.stream(inputs, config, stream_mode=["values", "messages"]):
+        if mode == "values":
+            final_state = payload
+            for sink in value_sinks:
+                sink(payload)
+            continue
+        chunk, metadata = payload
+        for sink in message_sinks:
+            sink(chunk, metadata)
+        if token_sinks and metadata.get("langgraph_node") == token_node:
+            text = chunk_text(chunk)
+            if text:
+                for sink in token_sinks:
+                    sink(text, metadata)
+    return final_state
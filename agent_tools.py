@@ -0,0 +1,492 @@
+import asyncio
+import atexit
+import functools
+import importlib.util
+import inspect
+import json
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from pathlib import Path
+
+import httpx
+from langchain_core.tools import StructuredTool, tool
+
+import safe_math
+
+# ============================================================================
+# SHARED HTTP CLIENTS
+# ============================================================================
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+TIMEOUT = 5
+# HTTP/2 needs the optional `h2` package; fall back to HTTP/1.1 keep-alive
+HTTP2 = importlib.util.find_spec("h2") is not None
+LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30)
+
+SEARCH_URL = "https://api.duckduckgo.com/"
+GEOCODING_URL = "https://geocoding-api.open-meteo.com/v1/search"
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+
+_client = None
+_client_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncClient
+_transport = None  # custom httpx transports, see configure_transport()
+_async_transport = None
+
+
+def get_client() -> httpx.Client:
+    """Return the process-wide pooled HTTP client (thread-safe)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(headers=HEADERS, timeout=TIMEOUT, limits=LIMITS, http2=HTTP2,
+                                       transport=_transport)
+    return _client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the pooled async HTTP client for the running event loop.
+
+    Async clients are bound to the loop they were created on, so one is kept
+    per loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(headers=HEADERS, timeout=TIMEOUT, limits=LIMITS, http2=HTTP2,
+                                   transport=_async_transport)
+        _async_clients[loop] = client
+    return client
+
+
+def close_clients():
+    """Close the shared sync client."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def configure_transport(transport=None, async_transport=None):
+    """Route tool HTTP traffic through custom httpx transports.
+
+    Used by agent_replay to record and replay responses; call with no
+    arguments to go back to the network. Existing clients are discarded.
+    """
+    global _transport, _async_transport
+    close_clients()
+    _async_clients.clear()
+    _transport, _async_transport = transport, async_transport
+
+
+async def aclose_clients():
+    """Close the async client of the running event loop."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+atexit.register(close_clients)
+
+# ============================================================================
+# GEOCODING CACHE
+# ============================================================================
+
+BUNDLED_CITIES = Path(__file__).with_name("geocode_cities.json")
+
+
+def normalize_city(city: str) -> str:
+    """Normalize a city name for cache lookups ("  Mumbai " -> "mumbai")."""
+    return " ".join(city.casefold().split()).strip(" .,")
+
+
+class GeocodeCache:
+    """On-disk LRU cache mapping city names to coordinates.
+
+    Coordinates never change, so after the first lookup of a city the weather
+    tool needs only the forecast request. Entries are kept in least-recently
+    used order and trimmed to ``max_entries``; the file is rewritten
+    atomically whenever a new city is added. With ``preload=True`` the bundled
+    ``geocode_cities.json`` table seeds the cache.
+    """
+
+    def __init__(self, path="geocode_cache.json", max_entries: int = 1000, preload: bool = False):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if preload and BUNDLED_CITIES.exists():
+            self._load(BUNDLED_CITIES)
+        if self.path.exists():
+            self._load(self.path)
+
+    def _load(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._entries.update(json.load(f))
+        except Exception as e:
+            print(f"Error loading geocode cache: {e}")
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, city: str):
+        """Return the cached location for ``city`` or None."""
+        key = normalize_city(city)
+        with self._lock:
+            location = self._entries.get(key)
+            if location is not None:
+                self._entries.move_to_end(key)
+            return location
+
+    def put(self, city: str, location: dict):
+        """Cache a location and persist the cache file."""
+        key = normalize_city(city)
+        with self._lock:
+            self._entries[key] = location
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def _save(self):
+        try:
+            tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error saving geocode cache: {e}")
+
+    def __len__(self):
+        return len(self._entries)
+
+
+geocode_cache = GeocodeCache(os.getenv("GEOCODE_CACHE_FILE", "geocode_cache.json"), preload=True)
+
+# ============================================================================
+# TOOL RESULT CACHE
+# ============================================================================
+
+_caches = {}  # name -> TTLCache, for cache_stats()
+_refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="tool-cache-refresh")
+_refresh_tasks = set()  # keeps background asyncio refreshes alive
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire after ``ttl`` seconds.
+
+    An expired entry is still served for another ``stale_ttl`` seconds while
+    it is refreshed in the background (stale-while-revalidate). Hit, miss,
+    stale and eviction counters are exposed through ``stats()``.
+    """
+
+    def __init__(self, name: str, ttl: float, maxsize: int = 256, stale_ttl: float = 0):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()  # key -> (value, stored_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.stale_hits = self.evictions = self.refreshes = 0
+        _caches[name] = self
+
+    def lookup(self, key):
+        """Return ``(state, value)`` where state is "fresh", "stale" or "miss"."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = now - stored_at
+                if age <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return "fresh", value
+                if age <= self.ttl + self.stale_ttl:
+                    self.stale_hits += 1
+                    return "stale", value
+                del self._entries[key]
+            self.misses += 1
+            return "miss", None
+
+    def store(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def claim_refresh(self, key) -> bool:
+        """Mark ``key`` as being refreshed; False if a refresh is already running."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self.refreshes += 1
+            return True
+
+    def release_refresh(self, key):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale_hits': self.stale_hits,
+                'evictions': self.evictions,
+                'refreshes': self.refreshes,
+            }
+
+
+def cache_stats() -> dict:
+    """Counters of every tool cache, keyed by cache name."""
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+def clear_caches():
+    """Empty the tool result caches (e.g. between replay runs)."""
+    for cache in _caches.values():
+        cache.clear()
+
+
+def _is_ok_result(result) -> bool:
+    """Tools report failures as strings; never cache those."""
+    return not (isinstance(result, str) and result.startswith(("Error", "Could not", "City '")))
+
+
+def cached_tool(cache: TTLCache, cache_if=_is_ok_result):
+    """Cache a tool function's results in ``cache``, keyed on its arguments.
+
+    Works on plain and async functions; apply it under ``@tool`` (or before
+    ``StructuredTool.from_function``). Sync and async variants of one tool
+    can share a cache.
+    """
+    def decorator(func):
+        def make_key(args, kwargs):
+            return args + tuple(sorted(kwargs.items()))
+
+        if inspect.iscoroutinefunction(func):
+            async def refresh(key, args, kwargs):
+                try:
+                    value = await func(*args, **kwargs)
+                    if cache_if(value):
+                        cache.store(key, value)
+                finally:
+                    cache.release_refresh(key)
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = make_key(args, kwargs)
+                state, value = cache.lookup(key)
+                if state == "stale" and cache.claim_refresh(key):
+                    task = asyncio.get_running_loop().create_task(refresh(key, args, kwargs))
+                    _refresh_tasks.add(task)
+                    task.add_done_callback(_refresh_tasks.discard)
+                if state != "miss":
+                    return value
+                value = await func(*args, **kwargs)
+                if cache_if(value):
+                    cache.store(key, value)
+                return value
+
+            async_wrapper.cache = cache
+            return async_wrapper
+
+        def refresh(key, args, kwargs):
+            try:
+                value = func(*args, **kwargs)
+                if cache_if(value):
+                    cache.store(key, value)
+            finally:
+                cache.release_refresh(key)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs)
+            state, value = cache.lookup(key)
+            if state == "stale" and cache.claim_refresh(key):
+                _refresh_pool.submit(refresh, key, args, kwargs)
+            if state != "miss":
+                return value
+            value = func(*args, **kwargs)
+            if cache_if(value):
+                cache.store(key, value)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+# Per-tool TTLs: search results drift slowly, weather changes within the
+# hour, arithmetic never changes
+search_cache = TTLCache("web_search", ttl=300, maxsize=512, stale_ttl=900)
+weather_cache = TTLCache("get_weather", ttl=600, maxsize=256, stale_ttl=1800)
+calculator_cache = TTLCache("calculator", ttl=86400, maxsize=1024)
+
+# ============================================================================
+# TOOLS
+# ============================================================================
+
+def _search_params(query: str) -> dict:
+    return {"q": query, "format": "json"}
+
+
+def _search_result(query: str, response) -> str:
+    if response.status_code == 200:
+        return f"Search results for '{query}': {response.text[:500]}"
+    return f"Could not fetch results for '{query}'"
+
+
+@cached_tool(search_cache)
+def _web_search(query: str) -> str:
+    """Search the web for information."""
+    try:
+        response = get_client().get(SEARCH_URL, params=_search_params(query))
+        return _search_result(query, response)
+    except Exception as e:
+        return f"Error searching: {str(e)}"
+
+
+@cached_tool(search_cache)
+async def _aweb_search(query: str) -> str:
+    try:
+        response = await get_async_client().get(SEARCH_URL, params=_search_params(query))
+        return _search_result(query, response)
+    except Exception as e:
+        return f"Error searching: {str(e)}"
+
+
+# Define a calculator tool (AST-whitelisted, size-limited; see safe_math)
+@tool
+@cached_tool(calculator_cache)
+def calculator(expression: str) -> str:
+    """Evaluate mathematical expressions."""
+    try:
+        result = safe_math.evaluate(expression)
+        return f"{expression} = {result}"
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+@tool
+def calculator_batch(expressions: list[str]) -> str:
+    """Evaluate several mathematical expressions in one call, one result per line."""
+    lines = []
+    for expression, result in zip(expressions, safe_math.evaluate_batch(expressions)):
+        if isinstance(result, Exception):
+            lines.append(f"{expression}: Error: {str(result)}")
+        else:
+            lines.append(f"{expression} = {result}")
+    return "\n".join(lines)
+
+
+def _geocode_params(city: str) -> dict:
+    return {"name": city, "count": 1, "language": "en", "format": "json"}
+
+
+def _parse_location(data: dict):
+    """Pick the first geocoding match as a {latitude, longitude, name, country} dict."""
+    if not data.get("results"):
+        return None
+    location = data["results"][0]
+    return {
+        "latitude": location.get("latitude"),
+        "longitude": location.get("longitude"),
+        "name": location.get("name"),
+        "country": location.get("country"),
+    }
+
+
+def _forecast_params(location: dict) -> dict:
+    return {
+        "latitude": location["latitude"],
+        "longitude": location["longitude"],
+        "current": "temperature_2m,weather_code,wind_speed_10m",
+        "temperature_unit": "celsius"
+    }
+
+
+def _weather_result(city: str, location: dict, weather_response) -> str:
+    if weather_response.status_code == 200:
+        current = weather_response.json().get("current", {})
+        temp = current.get("temperature_2m", "N/A")
+        wind = current.get("wind_speed_10m", "N/A")
+        return (f"Weather in {location['name']}, {location['country']}: "
+                f"Temperature: {temp}°C, Wind Speed: {wind} km/h")
+    return f"Could not fetch weather for {city}"
+
+
+@cached_tool(weather_cache)
+def _get_weather(city: str) -> str:
+    """Get current weather information for a city."""
+    try:
+        client = get_client()
+        # Using Open-Meteo API (free, no API key required)
+        location = geocode_cache.get(city)
+        if location is None:
+            response = client.get(GEOCODING_URL, params=_geocode_params(city))
+            if response.status_code != 200:
+                return "Error fetching weather data"
+            location = _parse_location(response.json())
+            if location is None:
+                return f"City '{city}' not found"
+            geocode_cache.put(city, location)
+        weather_response = client.get(FORECAST_URL, params=_forecast_params(location))
+        return _weather_result(city, location, weather_response)
+    except Exception as e:
+        return f"Error getting weather: {str(e)}"
+
+
+@cached_tool(weather_cache)
+async def _aget_weather(city: str) -> str:
+    try:
+        client = get_async_client()
+        location = geocode_cache.get(city)
+        if location is None:
+            response = await client.get(GEOCODING_URL, params=_geocode_params(city))
+            if response.status_code != 200:
+                return "Error fetching weather data"
+            location = _parse_location(response.json())
+            if location is None:
+                return f"City '{city}' not found"
+            geocode_cache.put(city, location)
+        weather_response = await client.get(FORECAST_URL, params=_forecast_params(location))
+        return _weather_result(city, location, weather_response)
+    except Exception as e:
+        return f"Error getting weather: {str(e)}"
+
+
+# Tools with both sync and async implementations, so agent.ainvoke never
+# blocks the event loop on network I/O
+web_search = StructuredTool.from_function(func=_web_search, coroutine=_aweb_search, name="web_search")
+get_weather = StructuredTool.from_function(func=_get_weather, coroutine=_aget_weather, name="get_weather")
+
+TOOLS = [web_search, calculator, calculator_batch, get_weather]
+
+# Function to extract tool calls from agent response
+def get_tool_calls(result):
+    """Extract tool names called during agent execution."""
+    tools_called = []
+    for message in result['messages']:
+        if hasattr(message, 'tool_calls') and message.tool_calls:
+            for tool_call in message.tool_calls:
+                tools_called.append(tool_call.get('name', 'unknown'))
+    return tools_called
@@ -0,0 +1,216 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+import agent_tools
+
+# ============================================================================
+# LATENCY AND TOKEN TRACING
+# ============================================================================
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile of ``values`` (q in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), math.ceil(q / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def _token_usage(response) -> dict:
+    """Pull token counts out of an LLMResult (usage_metadata or llm_output)."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, 'message', None), 'usage_metadata', None)
+            if usage:
+                details = usage.get('input_token_details') or {}
+                return {
+                    'input_tokens': usage.get('input_tokens', 0),
+                    'output_tokens': usage.get('output_tokens', 0),
+                    'cache_read_tokens': details.get('cache_read', 0),
+                }
+    usage = (response.llm_output or {}).get('token_usage') or {}
+    details = usage.get('prompt_tokens_details') or {}
+    return {
+        'input_tokens': usage.get('prompt_tokens', 0),
+        'output_tokens': usage.get('completion_tokens', 0),
+        'cache_read_tokens': details.get('cached_tokens', 0),
+    }
+
+
+class AgentTracer(BaseCallbackHandler):
+    """Callback that times model calls, tool calls and whole agent steps.
+
+    Every finished call becomes a record ({kind, name, latency, tokens,
+    error}) that is kept in memory and appended to a JSONL sink. Retries are
+    counted from ``on_retry``, prompt-cache hits from the provider's
+    ``cache_read`` token counts, and tool-cache hits from
+    ``agent_tools.cache_stats()`` around each step.
+
+    Usage:
+        tracer = AgentTracer("agent_trace.jsonl")
+        with tracer.span("agent_step"):
+            agent.invoke(inputs, config={"callbacks": [tracer]})
+        tracer.print_summary()
+    """
+
+    def __init__(self, sink_path="agent_trace.jsonl"):
+        self.sink_path = Path(sink_path) if sink_path else None
+        self.records = []
+        self.retries = 0
+        self.tool_cache_hits = 0
+        self._starts = {}  # run_id -> (kind, name, start time)
+        self._lock = threading.Lock()
+
+    # -- recording -----------------------------------------------------------
+
+    def _start(self, run_id, kind: str, name: str):
+        with self._lock:
+            self._starts[run_id] = (kind, name, time.perf_counter())
+
+    def _finish(self, run_id, error=None, **fields):
+        with self._lock:
+            started = self._starts.pop(run_id, None)
+        if started is None:
+            return
+        kind, name, start = started
+        self.record(kind, name, time.perf_counter() - start, error=error, **fields)
+
+    def record(self, kind: str, name: str, latency: float, error=None, **fields):
+        """Store one timing record and append it to the sink."""
+        record = {
+            'timestamp': time.time(),
+            'kind': kind,
+            'name': name,
+            'latency': round(latency, 6),
+            'error': str(error) if error else None,
+            **fields,
+        }
+        with self._lock:
+            self.records.append(record)
+            if self.sink_path:
+                with open(self.sink_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record) + '\n')
+
+    @contextmanager
+    def span(self, name: str = "agent_step"):
+        """Time a block (e.g. one run_agent_with_memory call) as a "step" record."""
+        hits_before = self._cache_hits()
+        start = time.perf_counter()
+        error = None
+        try:
+            yield self
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            hits = self._cache_hits() - hits_before
+            self.tool_cache_hits += hits
+            self.record('step', name, time.perf_counter() - start, error=error, tool_cache_hits=hits)
+
+    @staticmethod
+    def _cache_hits() -> int:
+        return sum(s['hits'] + s['stale_hits'] for s in agent_tools.cache_stats().values())
+
+    # -- callback hooks --------------------------------------------------------
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, 'model', (serialized or {}).get('name') or 'chat_model')
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, 'model', (serialized or {}).get('name') or 'llm')
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id, **_token_usage(response))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, 'tool', (serialized or {}).get('name') or 'tool')
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=error)
+
+    def on_retry(self, retry_state, *, run_id, **kwargs):
+        with self._lock:
+            self.retries += 1
+
+    # -- reporting -------------------------------------------------------------
+
+    def summary(self) -> dict:
+        """Per-kind call counts, p50/p95/p99 latency and token totals."""
+        with self._lock:
+            records = list(self.records)
+        summary = {}
+        for kind in ('step', 'model', 'tool'):
+            latencies = [r['latency'] for r in records if r['kind'] == kind]
+            if not latencies:
+                continue
+            summary[kind] = {
+                'count': len(latencies),
+                'errors': sum(1 for r in records if r['kind'] == kind and r['error']),
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'p99': percentile(latencies, 99),
+            }
+        summary['tokens'] = {
+            key: sum(r.get(key, 0) for r in records if r['kind'] == 'model')
+            for key in ('input_tokens', 'output_tokens', 'cache_read_tokens')
+        }
+        summary['retries'] = self.retries
+        summary['tool_cache_hits'] = self.tool_cache_hits
+        return summary
+
+    def prometheus_text(self) -> str:
+        """Render the summary in the Prometheus text exposition format."""
+        summary = self.summary()
+        lines = [
+            "# HELP agent_latency_seconds Agent call latency by kind.",
+            "# TYPE agent_latency_seconds summary",
+        ]
+        for kind in ('step', 'model', 'tool'):
+            if kind not in summary:
+                continue
+            for q in ('p50', 'p95', 'p99'):
+                quantile = int(q[1:]) / 100
+                lines.append(f'agent_latency_seconds{{kind="{kind}",quantile="{quantile}"}} {summary[kind][q]}')
+            lines.append(f'agent_latency_seconds_count{{kind="{kind}"}} {summary[kind]["count"]}')
+        lines += [
+            "# HELP agent_tokens_total Tokens reported by the model provider.",
+            "# TYPE agent_tokens_total counter",
+        ]
+        for key, value in summary['tokens'].items():
+            lines.append(f'agent_tokens_total{{type="{key.replace("_tokens", "")}"}} {value}')
+        lines += [
+            "# TYPE agent_retries_total counter",
+            f"agent_retries_total {summary['retries']}",
+            "# TYPE agent_tool_cache_hits_total counter",
+            f"agent_tool_cache_hits_total {summary['tool_cache_hits']}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path="agent_metrics.prom"):
+        """Write the Prometheus text file (e.g. for node_exporter's textfile collector)."""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+
+    def print_summary(self):
+        """Print latency percentiles and token totals."""
+        summary = self.summary()
+        for kind, label in (('step', 'Agent steps'), ('model', 'Model calls'), ('tool', 'Tool calls')):
+            if kind in summary:
+                s = summary[kind]
+                print(f"⏱️  {label}: {s['count']} | p50 {s['p50']:.2f}s | p95 {s['p95']:.2f}s | p99 {s['p99']:.2f}s")
+        tokens = summary['tokens']
+        print(f"🔢 Tokens: {tokens['input_tokens']} in ({tokens['cache_read_tokens']} cached) / "
+              f"{tokens['output_tokens']} out | Retries: {summary['retries']} | "
+              f"Tool cache hits: {summary['tool_cache_hits']}")
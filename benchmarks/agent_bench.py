@@ -0,0 +1,258 @@
+"""Benchmarks for the agent pipeline with regression checks against a baseline.
+
+USAGE:
+    python benchmarks/agent_bench.py                    # run and compare with baseline.json
+    python benchmarks/agent_bench.py --sizes 1000       # quick run
+    python benchmarks/agent_bench.py --update-baseline  # store this machine's numbers as the baseline
+
+Measures ConversationMemory add/load/get_context throughput at several
+history sizes, get_tool_calls over large message lists, tool wrapper
+overhead, and end-to-end agent turns against a scripted (offline) model.
+Every metric is the best of --repeat timed samples of at least 0.2s each
+(after a warm-up for the agent turns). Results are printed as JSON (and
+written to --output). The exit status is 1 when any metric is worse than
+the baseline by more than --tolerance in two consecutive runs. Baselines are machine-specific and not committed: without a
+local baseline.json the check is skipped.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+# Make the repo modules importable when run as benchmarks/agent_bench.py
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+# The agent module builds a ChatOpenAI at import time; the benchmarks never call it
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage  # noqa: E402
+from langgraph.prebuilt import create_react_agent  # noqa: E402
+
+import agent_tools  # noqa: E402
+import safe_math  # noqa: E402
+from agent_replay import ScriptedChatModel  # noqa: E402
+from conversation_memory import ConversationMemory  # noqa: E402
+
+BASELINE_FILE = Path(__file__).with_name("baseline.json")
+DEFAULT_SIZES = [1000, 10000, 100000]
+# The whole-document JSON backend is O(n) per message; only time it small
+JSON_BACKEND_MAX = 1000
+REPEAT = 5
+# Shortest timed sample; shorter ones are dominated by scheduler noise
+MIN_SAMPLE_SECONDS = 0.2
+
+
+def _rate(count: int, seconds: float) -> float:
+    return count / seconds if seconds > 0 else float('inf')
+
+
+def _timed(func, number: int = 1, setup=None) -> float:
+    """Best wall time for ``number`` calls over REPEAT samples (``setup`` runs untimed before each).
+
+    Without ``setup`` each sample is stretched to at least MIN_SAMPLE_SECONDS
+    and scaled back to ``number`` calls.
+    """
+    if setup is None:
+        timer = timeit.Timer(func)
+        calls = number
+        while timer.timeit(calls) < MIN_SAMPLE_SECONDS:
+            calls *= 2
+        return min(timer.repeat(number=calls, repeat=REPEAT)) * number / calls
+    best = float('inf')
+    for _ in range(REPEAT):
+        setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _metric(value: float, unit: str = "ops/s", higher_is_better: bool = True) -> dict:
+    return {'value': round(value, 6), 'unit': unit, 'higher_is_better': higher_is_better}
+
+# ============================================================================
+# BENCHMARKS
+# ============================================================================
+
+def bench_memory(sizes: list, tmp: Path) -> dict:
+    results = {}
+    for backend, suffix in (('json', '.json'), ('jsonl', '.jsonl'), ('sqlite', '.db')):
+        for n in sizes:
+            if backend == 'json' and n > JSON_BACKEND_MAX:
+                continue
+            path = tmp / f"memory_{backend}_{n}{suffix}"
+            pairs = n // 2
+            state = {}
+
+            def fresh():
+                # Every timed run appends to an empty history
+                if state:
+                    state['memory'].close()
+                path.unlink(missing_ok=True)
+                state['memory'] = ConversationMemory(path)
+
+            seconds = _timed(lambda: [
+                state['memory'].add_exchange(f"question {i} about the weather in London",
+                                             f"answer {i}: it is mild with a light breeze", ['get_weather'])
+                for i in range(pairs)
+            ], setup=fresh)
+            state['memory'].close()
+            results[f"memory.{backend}.add.{n}"] = _metric(_rate(pairs * 2, seconds), "msgs/s")
+
+            loads = max(1, 10000 // n)
+            seconds = _timed(lambda: ConversationMemory(path).close(), loads)
+            results[f"memory.{backend}.load.{n}"] = _metric(seconds / loads, "s", False)
+
+            memory = ConversationMemory(path)
+            calls = 10000
+            seconds = _timed(memory.get_context, calls)
+            results[f"memory.{backend}.get_context.{n}"] = _metric(_rate(calls, seconds), "calls/s")
+            memory.close()
+    return results
+
+
+def bench_get_tool_calls(sizes: list) -> dict:
+    results = {}
+    for n in sizes:
+        messages = []
+        for i in range(n // 3):
+            messages.append(AIMessage("", tool_calls=[{'name': 'calculator', 'args': {'expression': '1+1'}, 'id': f"c{i}"}]))
+            messages.append(ToolMessage("1+1 = 2", tool_call_id=f"c{i}"))
+            messages.append(HumanMessage("next"))
+        result = {'messages': messages}
+        repeat = max(1, 100000 // n)
+        seconds = _timed(lambda: agent_tools.get_tool_calls(result), repeat)
+        results[f"get_tool_calls.{n}"] = _metric(_rate(len(messages) * repeat, seconds), "msgs/s")
+    return results
+
+
+def bench_tool_overhead() -> dict:
+    calls = 5000
+    expressions = [f"{i} * 4 + 100" for i in range(calls)]
+    raw = _timed(lambda: [safe_math.evaluate(e) for e in expressions])
+    wrapped = _timed(lambda: [agent_tools.calculator.invoke({'expression': e}) for e in expressions],
+                     setup=agent_tools.calculator_cache.clear)
+    cached = _timed(lambda: [agent_tools.calculator.invoke({'expression': e}) for e in expressions])
+    return {
+        'tool.calculator.raw': _metric(raw / calls * 1e6, "us/call", False),
+        'tool.calculator.invoke': _metric(wrapped / calls * 1e6, "us/call", False),
+        'tool.calculator.invoke_cached': _metric(cached / calls * 1e6, "us/call", False),
+        'tool.calculator.wrapper_overhead': _metric((wrapped - raw) / calls * 1e6, "us/call", False),
+    }
+
+
+def _scripted_model():
+    return ScriptedChatModel(responses=[
+        AIMessage("", tool_calls=[{'name': 'calculator', 'args': {'expression': '25 * 4 + 100'}, 'id': 'call_1'}]),
+        AIMessage("25 * 4 + 100 = 200"),
+    ])
+
+
+def bench_agent_turns(tmp: Path, turns: int = 50) -> dict:
+    import building_first_agent_5 as agent5
+
+    agent = create_react_agent(_scripted_model(), agent_tools.TOOLS)
+    turn = lambda: agent.invoke({'messages': "What is 25 * 4 + 100?"})  # noqa: E731
+    for _ in range(5):  # warm up: graph compilation, tool schemas, lazy imports
+        turn()
+    seconds = _timed(turn, turns)
+    results = {'agent.turn.no_memory': _metric(_rate(turns, seconds), "turns/s")}
+
+    memory = ConversationMemory(tmp / "agent_turns.jsonl")
+    turn = lambda: agent5.run_agent_with_memory("What is 25 * 4 + 100?", agent, memory)  # noqa: E731
+    for _ in range(5):
+        turn()
+    seconds = _timed(turn, turns)
+    memory.close()
+    results['agent.turn.with_memory'] = _metric(_rate(turns, seconds), "turns/s")
+    return results
+
+
+def run_all(sizes: list) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        results.update(bench_memory(sizes, tmp))
+        results.update(bench_get_tool_calls(sizes))
+        results.update(bench_tool_overhead())
+        results.update(bench_agent_turns(tmp))
+    return results
+
+# ============================================================================
+# REGRESSION CHECK
+# ============================================================================
+
+def best_of(first: dict, second: dict) -> dict:
+    """Per metric, the better of two runs."""
+    pick = lambda a, b: a if (a['value'] >= b['value']) == a['higher_is_better'] else b  # noqa: E731
+    return {name: pick(first[name], second[name]) if name in second else first[name] for name in first}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Return (metric, baseline, current, change) for every regression beyond ``tolerance``."""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None or not base['value']:
+            continue
+        change = (current['value'] - base['value']) / base['value']
+        worse = -change if current['higher_is_better'] else change
+        if worse > tolerance:
+            regressions.append((name, base['value'], current['value'], change))
+    return regressions
+
+
+def main():
+    global REPEAT
+    parser = argparse.ArgumentParser(description="Agent pipeline benchmarks.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated history sizes")
+    parser.add_argument("--baseline", default=str(BASELINE_FILE))
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="Allowed relative slowdown before failing (0.3 = 30%%)")
+    parser.add_argument("--repeat", type=int, default=REPEAT,
+                        help="Timed samples per metric; the best one is reported")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+    REPEAT = args.repeat
+
+    results = run_all([int(s) for s in args.sizes.split(",")])
+    print(json.dumps(results, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+        baseline.update(results)
+        baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline updated: {baseline_path}")
+        return
+    if not baseline_path.exists():
+        print(f"No baseline at {baseline_path}; skipping the regression check "
+              "(run with --update-baseline on this machine to create one)")
+        return
+
+    baseline = json.loads(baseline_path.read_text())
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        # One slow run is usually a noisy machine: only report what a second run confirms
+        print(f"{len(regressions)} metric(s) beyond tolerance; re-running to confirm")
+        results = best_of(results, run_all([int(s) for s in args.sizes.split(",")]))
+        regressions = compare(results, baseline, args.tolerance)
+    for name, base, current, change in regressions:
+        print(f"❌ REGRESSION {name}: {base} -> {current} ({change:+.0%})")
+    if regressions:
+        raise SystemExit(1)
+    print(f"✅ No regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,618 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+# ============================================================================
+# STORAGE BACKENDS
+# ============================================================================
+
+class JSONStorage:
+    """Stores the whole history as one JSON document (rewritten on every save)."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._history = []
+
+    def load(self):
+        """Yield stored messages."""
+        if not self.path.exists():
+            return
+        with open(self.path, 'r') as f:
+            data = json.load(f)
+        self._history = data.get('history', [])
+        yield from self._history
+
+    def append(self, messages: list):
+        """Append messages and rewrite the document."""
+        self._history.extend(messages)
+        with open(self.path, 'w') as f:
+            json.dump({
+                'history': self._history,
+                'last_updated': datetime.now().isoformat()
+            }, f, indent=2)
+
+    def flush(self):
+        pass
+
+    def clear(self):
+        self._history = []
+        if self.path.exists():
+            self.path.unlink()
+
+    def close(self):
+        pass
+
+
+class JSONLStorage:
+    """Append-only log with one JSON message per line.
+
+    Each append costs one line write regardless of history size. Writes are
+    flushed and fsync'ed in batches of ``fsync_every`` messages (or after
+    ``fsync_interval`` seconds), so a crash loses at most one batch and never
+    corrupts earlier lines; a torn last line is skipped on load and cut off
+    before the next append, so new lines never join onto it. When
+    ``max_messages`` is set the log is compacted to the newest messages once
+    it grows past twice that size.
+    """
+
+    def __init__(self, path, fsync_every: int = 10, fsync_interval: float = 1.0,
+                 max_messages: int = None):
+        self.path = Path(path)
+        self.fsync_every = max(1, fsync_every)
+        self.fsync_interval = fsync_interval
+        self.max_messages = max_messages
+        self._file = None
+        self._valid_end = None  # byte offset after the last complete line, set by load()
+        self._line_count = 0
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def load(self):
+        """Stream messages from the log, skipping torn or corrupt lines."""
+        self._line_count = 0
+        if not self.path.exists():
+            return
+        valid_end = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # torn write from a crash
+                valid_end += len(line)
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                self._line_count += 1
+                yield message
+        # Only trusted once the whole file was read (callers may stop iterating early)
+        self._valid_end = valid_end
+
+    def _complete_end(self) -> int:
+        """Byte offset just past the last newline, scanning back from the end of the file."""
+        with open(self.path, 'rb') as f:
+            end = f.seek(0, os.SEEK_END)
+            while end > 0:
+                start = max(0, end - 65536)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b'\n')
+                if newline != -1:
+                    return start + newline + 1
+                end = start
+        return 0
+
+    def _open(self):
+        if self._file is None:
+            if self.path.exists():
+                # Drop a torn last line so the next record starts on a fresh line
+                valid_end = self._valid_end if self._valid_end is not None else self._complete_end()
+                if self.path.stat().st_size > valid_end:
+                    os.truncate(self.path, valid_end)
+            self._valid_end = None  # stale once we append
+            self._file = open(self.path, 'a', encoding='utf-8')
+        return self._file
+
+    def append(self, messages: list):
+        """Append messages as JSON lines."""
+        f = self._open()
+        f.write(''.join(json.dumps(m, ensure_ascii=False) + '\n' for m in messages))
+        self._line_count += len(messages)
+        self._pending += len(messages)
+        if (self._pending >= self.fsync_every
+                or time.monotonic() - self._last_sync >= self.fsync_interval):
+            self.flush()
+        if self.max_messages and self._line_count > 2 * self.max_messages:
+            self.compact()
+
+    def flush(self):
+        """Flush buffered lines and fsync them to disk."""
+        if self._file is not None and self._pending:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def compact(self):
+        """Rewrite the log atomically, dropping corrupt lines and old messages."""
+        self.flush()
+        self.close()
+        messages = list(self.load())
+        if self.max_messages:
+            messages = messages[-self.max_messages:]
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(m, ensure_ascii=False) + '\n' for m in messages)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._line_count = len(messages)
+        self._valid_end = None
+
+    def clear(self):
+        self.close()
+        self._line_count = 0
+        self._valid_end = None
+        if self.path.exists():
+            self.path.unlink()
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+
+class SQLiteStorage:
+    """Multi-session store in a SQLite database running in WAL mode.
+
+    Messages are keyed by ``session_id`` and indexed on (session, timestamp)
+    and (session, role), so tail queries never scan other sessions. Per-session
+    message counts and the set of tools used are kept in side tables updated in
+    the same transaction as each insert.
+    """
+
+    indexed = True
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            tools_used TEXT NOT NULL DEFAULT '[]'
+        );
+        CREATE INDEX IF NOT EXISTS idx_messages_session_ts ON messages (session_id, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_messages_session_role ON messages (session_id, role);
+        CREATE TABLE IF NOT EXISTS session_stats (
+            session_id TEXT PRIMARY KEY,
+            total_messages INTEGER NOT NULL DEFAULT 0,
+            user_messages INTEGER NOT NULL DEFAULT 0,
+            assistant_messages INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS session_tools (
+            session_id TEXT NOT NULL,
+            tool TEXT NOT NULL,
+            PRIMARY KEY (session_id, tool)
+        );
+    """
+
+    def __init__(self, path, session_id: str = "default", timeout: float = 30.0):
+        self.path = Path(path)
+        self.session_id = session_id
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=timeout, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self._SCHEMA)
+
+    @staticmethod
+    def _row_to_message(row) -> dict:
+        return {
+            'timestamp': row[0],
+            'role': row[1],
+            'content': row[2],
+            'tools_used': json.loads(row[3])
+        }
+
+    def load(self):
+        """Yield every message of the session in order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT timestamp, role, content, tools_used FROM messages "
+                "WHERE session_id = ? ORDER BY timestamp, id",
+                (self.session_id,)
+            ).fetchall()
+        for row in rows:
+            yield self._row_to_message(row)
+
+    def tail(self, limit: int) -> list:
+        """Return the newest ``limit`` messages, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT timestamp, role, content, tools_used FROM messages "
+                "WHERE session_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (self.session_id, limit)
+            ).fetchall()
+        return [self._row_to_message(row) for row in reversed(rows)]
+
+    def append(self, messages: list):
+        """Insert messages and update the session counters atomically."""
+        user = sum(1 for m in messages if m['role'] == 'user')
+        assistant = sum(1 for m in messages if m['role'] == 'assistant')
+        tools = {tool for m in messages for tool in m.get('tools_used', [])}
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO messages (session_id, timestamp, role, content, tools_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(self.session_id, m['timestamp'], m['role'], m['content'],
+                  json.dumps(m.get('tools_used', []))) for m in messages]
+            )
+            self._conn.execute(
+                "INSERT INTO session_stats (session_id, total_messages, user_messages, assistant_messages) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (session_id) DO UPDATE SET "
+                "total_messages = total_messages + excluded.total_messages, "
+                "user_messages = user_messages + excluded.user_messages, "
+                "assistant_messages = assistant_messages + excluded.assistant_messages",
+                (self.session_id, len(messages), user, assistant)
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO session_tools (session_id, tool) VALUES (?, ?)",
+                [(self.session_id, tool) for tool in tools]
+            )
+
+    def stats(self) -> dict:
+        """Return the maintained counters for the session."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT total_messages, user_messages, assistant_messages "
+                "FROM session_stats WHERE session_id = ?",
+                (self.session_id,)
+            ).fetchone() or (0, 0, 0)
+            tools = [r[0] for r in self._conn.execute(
+                "SELECT tool FROM session_tools WHERE session_id = ?", (self.session_id,)
+            )]
+        return {
+            'total_messages': row[0],
+            'user_messages': row[1],
+            'assistant_messages': row[2],
+            'tools_used': tools
+        }
+
+    def flush(self):
+        pass
+
+    def clear(self):
+        """Delete the session's messages and counters."""
+        with self._lock, self._conn:
+            for table in ('messages', 'session_stats', 'session_tools'):
+                self._conn.execute(f"DELETE FROM {table} WHERE session_id = ?", (self.session_id,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_storage(memory_file, backend: str = None, **options):
+    """Create a storage backend; the file suffix picks it when ``backend`` is None."""
+    path = Path(memory_file)
+    if backend is None:
+        backend = {'.jsonl': 'jsonl', '.db': 'sqlite', '.sqlite': 'sqlite'}.get(path.suffix, 'json')
+    if backend == 'sqlite':
+        return SQLiteStorage(path, **options)
+    if backend == 'json':
+        return JSONStorage(path)
+    if backend == 'jsonl':
+        storage = JSONLStorage(path, **options)
+        legacy = path.with_suffix('.json')
+        if not path.exists() and legacy.exists():
+            # One-time migration from the old single-document format
+            with open(legacy, 'r') as f:
+                storage.append(json.load(f).get('history', []))
+            storage.flush()
+        return storage
+    raise ValueError(f"Unknown memory backend: {backend}")
+
+# ============================================================================
+# TOKEN-BUDGETED CONTEXT WINDOW
+# ============================================================================
+
+_encoding = None
+
+
+def _get_encoding():
+    """Return a tiktoken encoding, or False when tiktoken is unavailable."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")  # gpt-4o family
+        except Exception:
+            _encoding = False
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken, falling back to ~4 characters per token."""
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut ``text`` down to at most ``max_tokens`` tokens."""
+    encoding = _get_encoding()
+    if encoding:
+        return encoding.decode(encoding.encode(text)[:max_tokens])
+    return text[:max_tokens * 4]
+
+
+def render_message(message: dict) -> str:
+    role = "User" if message['role'] == 'user' else "Assistant"
+    return f"{role}: {message['content']}\n\n"
+
+
+def summarize_message(message: dict, max_chars: int = 120) -> str:
+    """One-line extractive summary of an evicted message."""
+    content = " ".join(message['content'].split())
+    if len(content) > max_chars:
+        content = content[:max_chars].rsplit(' ', 1)[0] + "..."
+    role = "User" if message['role'] == 'user' else "Assistant"
+    return f"- {role}: {content}"
+
+
+class ContextWindow:
+    """Rolling window of recent messages bounded by a token budget.
+
+    Every message is rendered and tokenized once, when it is appended. When
+    the window exceeds ``max_tokens`` the oldest messages are evicted down to
+    ``low_water`` of the budget (so the prompt prefix changes rarely) and are
+    folded into a running summary that is itself capped at ``summary_tokens``.
+    The default summary keeps what the user said (their statements about
+    themselves are what later questions refer back to). Pass ``summarizer(previous_summary, evicted_messages) -> str`` to replace
+    the default extractive summary, e.g. with an LLM call; it runs once per
+    eviction, never per query.
+    """
+
+    def __init__(self, max_tokens: int = 2000, summary_tokens: int = 200,
+                 low_water: float = 0.75, summarizer=None):
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        self.low_water = low_water
+        self.summarizer = summarizer
+        self.clear()
+
+    def clear(self):
+        self.entries = deque()  # (message, rendered text, tokens)
+        self.tokens = 0
+        self._summary_lines = deque()  # (line, tokens)
+        self._summary_token_count = 0
+        self.summary = ""
+        self._text = ""
+
+    def _entry(self, message: dict):
+        text = render_message(message)
+        tokens = count_tokens(text)
+        if tokens > self.max_tokens:
+            message = {**message, 'content': truncate_to_tokens(message['content'], self.max_tokens - 8)}
+            text = render_message(message)
+            tokens = count_tokens(text)
+        return message, text, tokens
+
+    def append(self, message: dict):
+        """Add a message, evicting old ones once the budget is exceeded."""
+        entry = self._entry(message)
+        self.entries.append(entry)
+        self.tokens += entry[2]
+        if self.tokens <= self.max_tokens:
+            self._text += entry[1]
+            return
+        target = int(self.max_tokens * self.low_water)
+        evicted = []
+        while self.tokens > target and len(self.entries) > 1:
+            old = self.entries.popleft()
+            self.tokens -= old[2]
+            evicted.append(old[0])
+        self._add_to_summary(evicted)
+        self._text = "".join(text for _, text, _ in self.entries)
+
+    def _add_to_summary(self, evicted: list):
+        if not evicted:
+            return
+        if self.summarizer is not None:
+            summary = self.summarizer(self.summary, evicted)
+            self.summary = truncate_to_tokens(summary, self.summary_tokens)
+            return
+        for message in evicted:
+            if message['role'] != 'user':
+                continue
+            line = summarize_message(message)
+            tokens = count_tokens(line)
+            self._summary_lines.append((line, tokens))
+            self._summary_token_count += tokens
+        while self._summary_token_count > self.summary_tokens and self._summary_lines:
+            _, tokens = self._summary_lines.popleft()
+            self._summary_token_count -= tokens
+        self.summary = "\n".join(line for line, _ in self._summary_lines)
+
+    def prime(self, history: list):
+        """Fill the window from stored history, newest messages first.
+
+        Only the messages that fit in the budget are tokenized; a few of the
+        ones just before them seed the summary.
+        """
+        self.clear()
+        kept = []
+        i = len(history) - 1
+        while i >= 0:
+            entry = self._entry(history[i])
+            if kept and self.tokens + entry[2] > self.max_tokens:
+                break
+            kept.append(entry)
+            self.tokens += entry[2]
+            i -= 1
+        self.entries.extend(reversed(kept))
+        self._text = "".join(text for _, text, _ in self.entries)
+        older = []
+        summary_tokens = 0
+        while i >= 0 and summary_tokens < self.summary_tokens:
+            older.append(history[i])
+            if history[i]['role'] == 'user':
+                summary_tokens += count_tokens(summarize_message(history[i]))
+            i -= 1
+        self._add_to_summary(older[::-1])
+
+    def messages(self) -> list:
+        """Messages currently inside the window, oldest first."""
+        return [message for message, _, _ in self.entries]
+
+    def render(self) -> str:
+        """Context string: running summary followed by the recent messages."""
+        if not self.summary:
+            return self._text
+        return f"Summary of earlier conversation:\n{self.summary}\n\n{self._text}"
+
+# ============================================================================
+# CONVERSATIONAL MEMORY SYSTEM
+# ============================================================================
+
+class ConversationMemory:
+    """Manages conversation history for context-aware agent responses.
+
+    File backends keep the history in ``conversation_history``. Indexed
+    backends (SQLite) leave it empty and answer context and statistics
+    queries from the database; use ``get_full_history`` to read everything.
+    """
+
+    # Messages fetched from indexed backends to prime the context window
+    PRIME_LIMIT = 200
+
+    def __init__(self, memory_file="agent_conversation_memory.json", backend=None,
+                 context_tokens: int = 2000, summary_tokens: int = 200, summarizer=None,
+                 **storage_options):
+        self.memory_file = Path(memory_file)
+        self.window = ContextWindow(context_tokens, summary_tokens, summarizer=summarizer)
+        self.storage = open_storage(self.memory_file, backend, **storage_options)
+        self.indexed = getattr(self.storage, 'indexed', False)
+        self.conversation_history = []  # Current session history
+        self._counts = {'total_messages': 0, 'user_messages': 0, 'assistant_messages': 0}
+        self._tools = {}  # insertion-ordered set of tool names
+        self.load_memory()
+        atexit.register(self.close)
+
+    def _count(self, messages):
+        for m in messages:
+            self._counts['total_messages'] += 1
+            if m['role'] == 'user':
+                self._counts['user_messages'] += 1
+            elif m['role'] == 'assistant':
+                self._counts['assistant_messages'] += 1
+            for tool in m.get('tools_used', []):
+                self._tools[tool] = None
+
+    def load_memory(self):
+        """Load previous conversation history from storage."""
+        try:
+            if self.indexed:
+                self.window.prime(self.storage.tail(self.PRIME_LIMIT))
+                return
+            self.conversation_history = list(self.storage.load())
+            self._count(self.conversation_history)
+            self.window.prime(self.conversation_history)
+        except Exception as e:
+            print(f"Error loading memory: {e}")
+
+    def save_memory(self):
+        """Flush pending writes to storage."""
+        try:
+            self.storage.flush()
+        except Exception as e:
+            print(f"Error saving memory: {e}")
+
+    def _append(self, messages: list):
+        if not self.indexed:
+            self.conversation_history.extend(messages)
+            self._count(messages)
+        for message in messages:
+            self.window.append(message)
+        try:
+            self.storage.append(messages)
+        except Exception as e:
+            print(f"Error saving memory: {e}")
+
+    @staticmethod
+    def _make_message(role: str, content: str, tools_used: list = None) -> dict:
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'role': role,
+            'content': content,
+            'tools_used': tools_used or []
+        }
+
+    def add_message(self, role: str, content: str, tools_used: list = None):
+        """Add a message to conversation history."""
+        self._append([self._make_message(role, content, tools_used)])
+
+    def add_exchange(self, query: str, answer: str, tools_used: list = None):
+        """Add a user question and the assistant answer in a single write."""
+        self._append([
+            self._make_message('user', query),
+            self._make_message('assistant', answer, tools_used),
+        ])
+
+    def get_context(self, limit: int = None) -> str:
+        """Get recent conversation context for the agent.
+
+        Without ``limit`` this returns the token-budgeted window (running
+        summary plus recent messages); with ``limit`` it returns the last
+        ``limit`` messages in full.
+        """
+        if limit is None:
+            return self.window.render()
+        if self.indexed:
+            recent = self.storage.tail(limit)
+        else:
+            recent = self.conversation_history[-limit:]
+        if not recent:
+            return ""
+
+        # Don't truncate - keep full content for better context
+        return "".join(
+            f"{'User' if msg['role'] == 'user' else 'Assistant'}: {msg['content']}\n\n"
+            for msg in recent
+        )
+
+    def get_context_messages(self) -> list:
+        """Messages in the token-budgeted context window, oldest first."""
+        return self.window.messages()
+
+    def get_full_history(self) -> list:
+        """Get complete conversation history."""
+        if self.indexed:
+            return list(self.storage.load())
+        return self.conversation_history
+
+    def clear_memory(self):
+        """Clear all conversation history."""
+        self.conversation_history = []
+        self._counts = dict.fromkeys(self._counts, 0)
+        self._tools = {}
+        self.window.clear()
+        self.storage.clear()
+
+    def close(self):
+        """Flush and release the storage backend."""
+        self.storage.close()
+
+    def get_stats(self) -> dict:
+        """Get conversation statistics."""
+        if self.indexed:
+            return self.storage.stats()
+        return {**self._counts, 'tools_used': list(self._tools)}
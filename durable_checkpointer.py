@@ -0,0 +1,136 @@
+import sqlite3
+import zlib
+
+from langchain_core.messages import HumanMessage, RemoveMessage, SystemMessage, trim_messages
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+# ============================================================================
+# COMPACT SERIALIZATION
+# ============================================================================
+
+class CompressedSerializer:
+    """Checkpoint serializer: msgpack (via JsonPlusSerializer) plus zlib.
+
+    Payloads of at least ``min_size`` bytes are compressed and tagged
+    "zlib+<type>", so checkpoints written without compression still load.
+    """
+
+    PREFIX = "zlib+"
+
+    def __init__(self, inner=None, level: int = 6, min_size: int = 256):
+        self.inner = inner or JsonPlusSerializer()
+        self.level = level
+        self.min_size = min_size
+
+    def dumps_typed(self, obj):
+        type_, data = self.inner.dumps_typed(obj)
+        if len(data) >= self.min_size:
+            return self.PREFIX + type_, zlib.compress(data, self.level)
+        return type_, data
+
+    def loads_typed(self, data):
+        type_, payload = data
+        if type_.startswith(self.PREFIX):
+            return self.inner.loads_typed((type_[len(self.PREFIX):], zlib.decompress(payload)))
+        return self.inner.loads_typed(data)
+
+    def dumps(self, obj):
+        return self.inner.dumps(obj)
+
+    def loads(self, data):
+        return self.inner.loads(data)
+
+# ============================================================================
+# DURABLE CHECKPOINTER
+# ============================================================================
+
+class PrunedSqliteSaver(SqliteSaver):
+    """SQLite checkpointer that keeps only the newest checkpoints per thread.
+
+    A drop-in replacement for ``MemorySaver``: state survives restarts
+    (invoking a graph with an existing ``thread_id`` resumes from its latest
+    checkpoint) and each thread keeps at most ``keep_last`` checkpoints, so
+    disk use stays bounded however long a deployment runs. Checkpoints are
+    stored msgpack-encoded and zlib-compressed.
+
+    This bounds how many checkpoints are kept, not how big one is: each
+    checkpoint still holds the thread's whole message list. Pair it with
+    ``retain_messages`` to cap that as well.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, *, keep_last: int = 20, serde=None):
+        super().__init__(conn, serde=serde or CompressedSerializer())
+        self.keep_last = keep_last
+
+    @classmethod
+    def from_path(cls, path: str = "agent_checkpoints.db", keep_last: int = 20):
+        """Open (or create) a checkpoint database on local disk."""
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return cls(conn, keep_last=keep_last)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        if self.keep_last:
+            self.prune(next_config["configurable"]["thread_id"],
+                       next_config["configurable"]["checkpoint_ns"])
+        return next_config
+
+    def prune(self, thread_id: str, checkpoint_ns: str = "", keep_last: int = None):
+        """Delete all but the newest ``keep_last`` checkpoints (and their writes) of a thread."""
+        keep_last = keep_last or self.keep_last
+        # Checkpoint ids are time-ordered UUIDs, so the newest sort last
+        keep = (
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT ?"
+        )
+        with self.cursor() as cur:
+            for table in ("writes", "checkpoints"):
+                cur.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? "
+                    f"AND checkpoint_id NOT IN ({keep})",
+                    (str(thread_id), checkpoint_ns, str(thread_id), checkpoint_ns, keep_last),
+                )
+
+    def vacuum(self):
+        """Reclaim the space freed by pruning."""
+        with self.lock:
+            self.conn.execute("VACUUM")
+
+# ============================================================================
+# MESSAGE RETENTION
+# ============================================================================
+
+def retain_messages(max_messages: int = 40):
+    """``pre_model_hook`` for ``create_react_agent`` that caps a thread's history.
+
+    Before each model call the state is cut to the system prompt plus the
+    newest ``max_messages`` messages, starting at a human turn so tool calls
+    are never split from their results. Older messages are removed from the
+    state itself, so checkpoints stop growing with the conversation. The
+    turn in progress is never cut: if it alone exceeds the cap, everything
+    before it is dropped and the turn is kept whole.
+
+    Usage:
+        agent = create_react_agent(model, tools, checkpointer=memory,
+                                   pre_model_hook=retain_messages(40))
+    """
+    def hook(state):
+        messages = state["messages"]
+        if len(messages) <= max_messages:
+            return {}
+        kept = trim_messages(messages, strategy="last", token_counter=len,
+                             max_tokens=max_messages, start_on="human", include_system=True)
+        if not any(isinstance(m, HumanMessage) for m in kept):
+            # The current turn is longer than the cap: keep it from its question onward
+            last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=None)
+            if not last_human:  # no question yet, or nothing before it to drop
+                return {}
+            system = [messages[0]] if isinstance(messages[0], SystemMessage) else []
+            kept = system + messages[last_human:]
+        return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), *kept]}
+
+    return hook
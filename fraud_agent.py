@@ -0,0 +1,81 @@
+import pandas as pd
+from langchain_experimental.agents import create_pandas_dataframe_agent
+from langchain_google_genai import ChatGoogleGenerativeAI
+import os
+from langchain_openai import OpenAI
+from fraud_data import csv_fingerprint, load_claims
+from fraud_index import SummaryIndex
+from fraud_batch import CLASSIFICATION_PROMPT, format_claim
+from fraud_sandbox import SandboxPool, install
+from fraud_tools import fraud_percentage_tool
+from fraud_query_cache import QueryCache
+os.environ["OPENAI_API_KEY"] = ''
+#'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'
+CLAIMS_CSV = os.getenv("CLAIMS_CSV", "/Users/nizam/Desktop/fraud_detection_agent/claims_dataset.csv")
+CLAIMS_COLUMNS = os.getenv("CLAIMS_COLUMNS")  # optional comma-separated column pruning
+CLAIMS_COLUMNS = CLAIMS_COLUMNS.split(",") if CLAIMS_COLUMNS else None
+
+def query_agent(agent, query: str):
+    """
+    Query the agent and return the response.
+    """
+    prompt = (
+        """
+        If it is just asking a question that requires a textual answer, reply as follows:
+        {"answer": "answer"}
+        For example:
+        {"answer": "The title with the highest rating is 'Gilead'"}
+        
+        If you do not know the answer, reply as follows:
+        {"answer": "I do not know."}
+        
+        Return all output as a string.
+        
+        All strings in "columns" list and data list, should be in double quotes,
+    
+        Lets think step by step.
+        """
+        + query
+    )
+
+    response = query_cache.ask(agent, query, prompt)
+    return response.__str__()
+
+# Create the LangChain agent
+def agent_is_replying(new_claim):
+    """Classify one claim (dict or DataFrame row) with the agent.
+
+    For whole files use the batch pipeline: python fraud_batch.py claims.csv
+    """
+    system_prompt = CLASSIFICATION_PROMPT.format(new_claim=format_claim(new_claim))
+    response = query_agent(agent, system_prompt)
+    print("Agent's classification:")
+    print(response)
+    return response
+
+# Worker processes of the sandbox pool may re-import this module (spawn); only run the demo as a script
+if __name__ == "__main__":
+    # Load the claims into a pandas DataFrame (memory-mapped columnar cache, rebuilt when the CSV changes)
+    df = load_claims(CLAIMS_CSV, columns=CLAIMS_COLUMNS)
+    # Counts, totals and describe() computed once, so common questions skip generated code
+    summary_index = SummaryIndex(df)
+    # Answers (and the code that produced them) memoized per question; keyed on the CSV's
+    # size/mtime so a changed file invalidates them without hashing the data at start-up
+    query_cache = QueryCache(path=os.getenv("QUERY_CACHE_DB", "agent_query_cache.db"),
+                             fingerprint=csv_fingerprint(CLAIMS_CSV, CLAIMS_COLUMNS))
+
+    # Create a Gemini language model instance
+    llm = OpenAI(openai_api_key=os.environ["OPENAI_API_KEY"], temperature=0)
+
+    # Deterministic groupby over the fraud label; no nested agent runs
+    tool1 = fraud_percentage_tool(df, label_column=os.getenv("CLAIMS_LABEL", "fraud"))
+
+    extra_tools = [summary_index.as_tool(), tool1]
+
+    agent = create_pandas_dataframe_agent(llm, df, verbose=True, extra_tools=extra_tools, allow_dangerous_code=True)
+    # Generated code runs in worker processes (shared-memory dataframe, CPU/memory limits, timeouts), not in-process
+    sandbox = SandboxPool(df, timeout=float(os.getenv("SANDBOX_TIMEOUT", "30")))
+    install(agent, sandbox)
+
+    # Example query
+    print(query_cache.ask(agent, "What is the total number of claims that are related to home?"))
@@ -0,0 +1,212 @@
+"""Classify a claims CSV for fraud in batches, resumably.
+
+USAGE:
+    python fraud_batch.py claims_dataset.csv --output fraud_scores.jsonl
+    python fraud_batch.py claims_dataset.csv --batch-size 25 --concurrency 8 --drop-columns policy_number
+    python fraud_batch.py unlabeled_claims.csv --label-column ""
+
+Claims are streamed from the CSV in chunks and packed ``--batch-size`` to a
+prompt; up to ``--concurrency`` prompts are in flight at once. Failed or
+unparseable responses are retried with backoff. Every classified claim is
+appended to the output JSONL as soon as its batch finishes, and that file is
+also the checkpoint: rerunning the same command skips claims already
+classified (claims that failed are retried). The ground-truth label column
+(``--label-column``, default ``fraud``) is never shown to the model.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# ============================================================================
+# PROMPTS
+# ============================================================================
+
+FRAUD_GUIDELINES = """You are a fraud detection agent. Your task is to classify insurance claims as fraudulent (1) or not fraudulent (0).
+Pay close attention to inconsistencies, suspicious patterns, and red flags.
+
+Here are some examples of how to classify claims:
+- A claim with a history of similar claims, inconsistent stories, and contradictory witness statements is likely fraudulent (1).
+- A claim for a non-covered procedure, like cosmetic surgery listed as a medical necessity, is fraudulent (1).
+- A claim with a valid police report, receipts for stolen items, and a clear incident description is likely not fraudulent (0).
+- A claim for a minor incident with an exaggerated injury claim, like whiplash from a fender bender with no visible damage, is suspicious and could be fraudulent (1)."""
+
+CLASSIFICATION_PROMPT = FRAUD_GUIDELINES + """
+
+Analyze the provided new claim data and the existing dataset to make your decision.
+Now, classify the following new claim:
+{new_claim}
+
+Based on your analysis, is this claim fraudulent? Answer with 0 for not fraudulent or 1 for fraudulent."""
+
+BATCH_PROMPT = FRAUD_GUIDELINES + """
+
+Classify each of the following claims (one per line, prefixed by its id):
+{claims}
+
+Reply with only a JSON object mapping every claim id to 0 (not fraudulent) or 1 (fraudulent), e.g. {{"17": 0, "18": 1}}."""
+
+
+def format_claim(claim) -> str:
+    """Render a claim (dict or pandas row) as "column=value; ..." for a prompt."""
+    items = claim.items() if hasattr(claim, 'items') else dict(claim).items()
+    return "; ".join(f"{k}={v}" for k, v in items if not pd.isna(v))
+
+# ============================================================================
+# BATCHING
+# ============================================================================
+
+def completed_ids(output_path) -> set:
+    """Ids already classified in an earlier run (the resume checkpoint)."""
+    done = set()
+    if not Path(output_path).exists():
+        return done
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn last line of an interrupted run
+            if record.get('label') is not None:
+                done.add(record['id'])
+    return done
+
+
+def iter_batches(csv_path, batch_size: int = 20, id_column: str = None, drop_columns=(),
+                 skip=frozenset(), chunksize: int = 10_000, label_column: str = "fraud"):
+    """Yield lists of (id, claim text) from the CSV without loading it whole.
+
+    ``label_column`` (the answer) is always left out of the claim text.
+    """
+    batch = []
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        # Chunks keep counting the row index, so row numbers are stable ids across runs
+        ids = chunk[id_column].astype(str) if id_column else chunk.index.astype(str)
+        hidden = (*drop_columns, id_column, label_column)
+        claims = chunk.drop(columns=[c for c in hidden if c and c in chunk.columns])
+        for claim_id, claim in zip(ids, claims.to_dict('records')):
+            if claim_id in skip:
+                continue
+            batch.append((claim_id, format_claim(claim)))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def parse_labels(text: str, ids: list) -> dict:
+    """Pull {id: 0/1} out of a model reply; raises ValueError if any id is missing."""
+    match = re.search(r'\{.*\}', text, re.DOTALL)
+    if not match:
+        raise ValueError("No JSON object in response")
+    raw = json.loads(match.group(0))
+    labels = {}
+    for claim_id in ids:
+        value = raw.get(claim_id)
+        if str(value).strip() not in ('0', '1'):
+            raise ValueError(f"Missing or invalid label for claim {claim_id}: {value!r}")
+        labels[claim_id] = int(str(value).strip())
+    return labels
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+async def classify_batch(llm, batch: list, retries: int = 3, backoff: float = 1.0) -> dict:
+    """Classify one packed prompt, retrying failures with exponential backoff."""
+    ids = [claim_id for claim_id, _ in batch]
+    prompt = BATCH_PROMPT.format(claims="\n".join(f"{claim_id}: {text}" for claim_id, text in batch))
+    for attempt in range(retries + 1):
+        try:
+            response = await llm.ainvoke(prompt)
+            return parse_labels(getattr(response, 'content', response), ids)
+        except Exception:
+            if attempt == retries:
+                raise
+            await asyncio.sleep(backoff * 2 ** attempt)
+
+
+async def classify_csv(llm, csv_path, output_path="fraud_scores.jsonl", batch_size: int = 20,
+                       concurrency: int = 4, retries: int = 3, id_column: str = None,
+                       drop_columns=(), backoff: float = 1.0, label_column: str = "fraud") -> dict:
+    """Stream ``csv_path`` through ``llm`` and append {id, label, error} lines to ``output_path``.
+
+    At most ``concurrency`` batches are in flight; the CSV is read only as
+    fast as batches finish. Returns counts for the run.
+    """
+    done = completed_ids(output_path)
+    stats = {'skipped': len(done), 'classified': 0, 'fraud': 0, 'failed': 0}
+    semaphore = asyncio.Semaphore(concurrency)
+    pending = set()
+
+    with open(output_path, 'a', encoding='utf-8') as out:
+        async def run(batch):
+            try:
+                try:
+                    labels, error = await classify_batch(llm, batch, retries, backoff), None
+                except Exception as e:
+                    labels, error = {}, str(e)
+                for claim_id, _ in batch:
+                    label = labels.get(claim_id)
+                    out.write(json.dumps({'id': claim_id, 'label': label, 'error': error}) + '\n')
+                    if label is None:
+                        stats['failed'] += 1
+                    else:
+                        stats['classified'] += 1
+                        stats['fraud'] += label
+                out.flush()
+            finally:
+                semaphore.release()
+
+        for batch in iter_batches(csv_path, batch_size, id_column, drop_columns, skip=done,
+                                  label_column=label_column):
+            await semaphore.acquire()
+            task = asyncio.create_task(run(batch))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        await asyncio.gather(*pending)
+        os.fsync(out.fileno())
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch fraud classification of a claims CSV.")
+    parser.add_argument("csv")
+    parser.add_argument("--output", default="fraud_scores.jsonl")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--batch-size", type=int, default=20, help="Claims per prompt")
+    parser.add_argument("--concurrency", type=int, default=4, help="Prompts in flight")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--id-column", default=None, help="Defaults to the row number")
+    parser.add_argument("--label-column", default="fraud",
+                        help='Ground-truth column kept out of the prompt ("" if the CSV has none)')
+    parser.add_argument("--drop-columns", default="", help="Comma-separated extra columns kept out of the prompt")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from langchain_openai import ChatOpenAI
+    load_dotenv()
+    llm = ChatOpenAI(model=args.model, temperature=0)
+    drop_columns = [c for c in args.drop_columns.split(",") if c]
+
+    start = time.perf_counter()
+    stats = asyncio.run(classify_csv(llm, args.csv, args.output, args.batch_size, args.concurrency,
+                                     args.retries, args.id_column, drop_columns,
+                                     label_column=args.label_column or None))
+    elapsed = time.perf_counter() - start
+    print(f"✅ Classified {stats['classified']:,} claims ({stats['fraud']:,} fraudulent) in {elapsed:.1f}s "
+          f"| {stats['classified'] / max(elapsed, 1e-9):.1f} claims/s")
+    print(f"⏭️  Skipped (already done): {stats['skipped']:,} | ❌ Failed: {stats['failed']:,}")
+    if stats['failed']:
+        print("💡 Rerun the same command to retry the failed claims")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Fast loading of the claims dataset for the pandas fraud agent.
+
+USAGE:
+    python fraud_data.py claims_dataset.csv                 # build / refresh the cache
+    python fraud_data.py claims_dataset.csv --columns claim_type,claim_amount
+
+The first load streams the CSV in chunks, infers compact dtypes (downcast
+integers, categoricals for low-cardinality text columns) and writes a
+columnar cache next to the CSV. Later loads memory-map the cache and read
+only the requested columns. The cache is rebuilt automatically when the CSV
+changes (size or modification time).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:  # no columnar cache; the CSV is parsed with the inferred dtypes every time
+    pa = None
+
+CACHE_VERSION = 1
+CHUNK_ROWS = 200_000
+MAX_CATEGORIES = 1000
+CATEGORY_RATIO = 0.5  # at most one distinct value per two rows
+
+# ============================================================================
+# DTYPE INFERENCE
+# ============================================================================
+
+def _int_dtype(low, high) -> str:
+    for dtype in ('int8', 'int16', 'int32', 'int64'):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return 'int64'
+
+
+def infer_dtypes(csv_path, chunksize: int = CHUNK_ROWS, max_categories: int = MAX_CATEGORIES,
+                 category_ratio: float = CATEGORY_RATIO) -> dict:
+    """Scan the CSV once in chunks and pick a compact dtype for every column.
+
+    Integer columns without gaps get the smallest integer type that holds
+    their range, other numeric columns stay float64, and text columns with
+    few distinct values become categoricals with a fixed category list (so
+    every chunk encodes them the same way).
+    """
+    stats = {}
+    rows = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize, low_memory=False):
+        rows += len(chunk)
+        for name, column in chunk.items():
+            s = stats.setdefault(name, {'kind': None, 'min': None, 'max': None, 'values': set()})
+            kind = column.dtype.kind
+            if kind in 'iu':
+                kind = 'i'
+            elif kind == 'f':
+                kind = 'f'
+            elif kind == 'b':
+                kind = 'b'
+            else:
+                kind = 'O'
+            # Widen: int -> float -> object; a column that is all-empty in a chunk reads as float
+            if s['kind'] is None or s['kind'] == kind:
+                s['kind'] = kind
+            elif {s['kind'], kind} <= {'i', 'f'}:
+                s['kind'] = 'f'
+            else:
+                s['kind'] = 'O'
+            if kind in 'if' and column.notna().any():
+                low, high = column.min(), column.max()
+                s['min'] = low if s['min'] is None else min(s['min'], low)
+                s['max'] = high if s['max'] is None else max(s['max'], high)
+            if s['values'] is not None:
+                s['values'].update(column.dropna().astype(str).unique())
+                if len(s['values']) > max_categories:
+                    s['values'] = None
+
+    dtypes = {}
+    for name, s in stats.items():
+        if s['kind'] == 'i':
+            dtypes[name] = _int_dtype(s['min'], s['max'])
+        elif s['kind'] == 'f':
+            dtypes[name] = 'float64'
+        elif s['kind'] == 'b':
+            dtypes[name] = 'bool'
+        elif s['values'] is not None and len(s['values']) <= max(1, rows * category_ratio):
+            dtypes[name] = {'category': sorted(s['values'])}
+        else:
+            dtypes[name] = 'string'
+    return dtypes
+
+
+def is_id_column(values: pd.Series) -> bool:
+    """Row identifiers: all-distinct integer columns that are sorted or named ``id`` / ``*_id``.
+
+    Continuous measurements (e.g. unrounded amounts) are often all-distinct
+    too, so uniqueness alone is not enough.
+    """
+    if not pd.api.types.is_integer_dtype(values) or not values.is_unique:
+        return False
+    name = str(values.name).casefold()
+    return (values.is_monotonic_increasing or values.is_monotonic_decreasing
+            or name == 'id' or name.endswith('_id'))
+
+
+def _pandas_dtypes(dtypes: dict) -> dict:
+    return {
+        name: pd.CategoricalDtype(dtype['category']) if isinstance(dtype, dict) else dtype
+        for name, dtype in dtypes.items()
+    }
+
+# ============================================================================
+# COLUMNAR CACHE
+# ============================================================================
+
+def _source_signature(csv_path: Path) -> dict:
+    stat = csv_path.stat()
+    return {'version': CACHE_VERSION, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def csv_fingerprint(csv_path, columns: list = None) -> str:
+    """Cheap identity of a loaded dataset: CSV size, mtime and cache version, plus the column selection.
+
+    Changes whenever load_claims would rebuild its cache, without reading the data.
+    """
+    signature = {**_source_signature(Path(csv_path)), 'columns': list(columns) if columns else None}
+    return hashlib.blake2b(json.dumps(signature, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+def cache_paths(csv_path, cache_dir=None, fmt: str = "feather"):
+    """Return (data file, metadata file) of the cache for ``csv_path``."""
+    csv_path = Path(csv_path)
+    directory = Path(cache_dir) if cache_dir else csv_path.parent
+    data = directory / f"{csv_path.stem}.{fmt}"
+    return data, data.with_name(data.name + ".json")
+
+
+def _read_meta(meta_path: Path):
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _open_writer(path: Path, schema, fmt: str):
+    if fmt == "parquet":
+        return pq.ParquetWriter(path, schema)
+    # Uncompressed so reads can be memory-mapped without decoding
+    return pa.ipc.new_file(str(path), schema, options=pa.ipc.IpcWriteOptions(compression=None))
+
+
+def build_cache(csv_path, cache_dir=None, fmt: str = "feather", chunksize: int = CHUNK_ROWS) -> Path:
+    """Convert the CSV to an uncompressed Feather (or Parquet) file, one chunk at a time."""
+    if pa is None:
+        raise ImportError("pyarrow is required for the columnar cache")
+    csv_path = Path(csv_path)
+    data_path, meta_path = cache_paths(csv_path, cache_dir, fmt)
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    dtypes = infer_dtypes(csv_path, chunksize)
+    tmp_path = data_path.with_name(data_path.name + ".tmp")
+
+    writer = None
+    try:
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=_pandas_dtypes(dtypes)):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = _open_writer(tmp_path, table.schema, fmt)
+            writer.write_table(table)
+        if writer is None:  # header-only CSV
+            empty = pa.Table.from_pandas(pd.read_csv(csv_path), preserve_index=False)
+            writer = _open_writer(tmp_path, empty.schema, fmt)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_path, data_path)
+
+    meta = {**_source_signature(csv_path), 'format': fmt, 'dtypes': dtypes}
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=1)
+    return data_path
+
+
+def cache_is_fresh(csv_path, cache_dir=None, fmt: str = "feather") -> bool:
+    csv_path = Path(csv_path)
+    data_path, meta_path = cache_paths(csv_path, cache_dir, fmt)
+    meta = _read_meta(meta_path)
+    if not meta or not data_path.exists():
+        return False
+    signature = _source_signature(csv_path)
+    return all(meta.get(key) == value for key, value in signature.items())
+
+# ============================================================================
+# LOADING
+# ============================================================================
+
+def load_claims(csv_path, columns: list = None, cache_dir=None, fmt: str = "feather",
+                chunksize: int = CHUNK_ROWS) -> pd.DataFrame:
+    """Load the claims dataset, building or reusing the columnar cache.
+
+    ``columns`` prunes the result to the named columns; only those are
+    read from the memory-mapped cache. Without pyarrow the CSV is parsed in
+    chunks with the inferred compact dtypes instead.
+    """
+    csv_path = Path(csv_path)
+    if pa is None:
+        dtypes = _pandas_dtypes(infer_dtypes(csv_path, chunksize))
+        chunks = pd.read_csv(csv_path, chunksize=chunksize, usecols=columns,
+                             dtype={k: v for k, v in dtypes.items() if not columns or k in columns})
+        return pd.concat(chunks, ignore_index=True)
+
+    if not cache_is_fresh(csv_path, cache_dir, fmt):
+        build_cache(csv_path, cache_dir, fmt, chunksize)
+    data_path, _ = cache_paths(csv_path, cache_dir, fmt)
+    if fmt == "parquet":
+        table = pq.read_table(data_path, columns=columns, memory_map=True)
+    else:
+        table = feather.read_table(data_path, columns=columns, memory_map=True)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the columnar cache for a claims CSV.")
+    parser.add_argument("csv")
+    parser.add_argument("--columns", default=None, help="Comma-separated columns to load")
+    parser.add_argument("--cache-dir", default=None)
+    parser.add_argument("--format", choices=["feather", "parquet"], default="feather")
+    args = parser.parse_args()
+
+    columns = args.columns.split(",") if args.columns else None
+    start = time.perf_counter()
+    df = load_claims(args.csv, columns, args.cache_dir, args.format)
+    print(f"📦 Loaded {len(df):,} rows x {len(df.columns)} columns in {time.perf_counter() - start:.2f}s "
+          f"({df.memory_usage(deep=True).sum() / 1e6:.1f} MB)")
+    print(df.dtypes.to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import json
+
+import pandas as pd
+from langchain_core.tools import Tool
+
+from fraud_data import is_id_column
+
+# ============================================================================
+# SUMMARY STATISTICS INDEX
+# ============================================================================
+
+MAX_GROUPS = 50  # columns with more distinct values are not grouped
+
+
+def _plain(value):
+    """NumPy scalar -> Python scalar, for JSON output."""
+    value = value.item() if hasattr(value, 'item') else value
+    return round(value, 4) if isinstance(value, float) else value
+
+
+class SummaryIndex:
+    """Aggregates over the claims dataframe, computed once at load.
+
+    - value counts for every low-cardinality column (categoricals, flags,
+      small integer codes);
+    - per-value count, sum and mean of the numeric columns for each of
+      those columns;
+    - ``describe()`` statistics for each numeric column.
+
+    Row-id columns and the columns in ``exclude`` are left out.
+    ``lookup`` answers common count/sum questions from these tables, and
+    ``as_tool`` exposes it to the dataframe agent so it can skip generating
+    pandas code for them.
+    """
+
+    def __init__(self, df: pd.DataFrame, max_groups: int = MAX_GROUPS, exclude=()):
+        self.rows = len(df)
+        skipped = {c for c in df.columns if c in set(exclude) or is_id_column(df[c])}
+        numeric = [c for c in df.select_dtypes('number').columns if c not in skipped]
+        self.numeric = {
+            c: {k: _plain(v) for k, v in df[c].describe().items()} for c in numeric
+        }
+        self.value_counts = {}
+        self.group_totals = {}
+        self._values = {}  # column -> {casefolded value: value}
+        for column in df.columns:
+            if column in skipped:
+                continue
+            counts = df[column].value_counts(dropna=True)
+            if len(counts) > max_groups or (column in self.numeric and len(counts) > 10):
+                continue
+            self.value_counts[column] = {str(k): int(v) for k, v in counts.items() if v}
+            self._values[column] = {str(k).casefold(): str(k) for k in self.value_counts[column]}
+            targets = [c for c in numeric if c != column]
+            if targets:
+                grouped = df.groupby(column, observed=True)[targets].agg(['sum', 'mean'])
+                self.group_totals[column] = {
+                    str(value): {
+                        target: {stat: _plain(row[(target, stat)]) for stat in ('sum', 'mean')}
+                        for target in targets
+                    }
+                    for value, row in grouped.iterrows()
+                }
+        self._columns = {c.casefold(): c for c in df.columns}
+
+    def columns(self) -> dict:
+        return {
+            'rows': self.rows,
+            'grouped_columns': {c: list(v) for c, v in self.value_counts.items()},
+            'numeric_columns': list(self.numeric),
+        }
+
+    def lookup(self, query: str) -> dict:
+        """Answer ``""``, ``"column"`` or ``"column=value"`` from the index."""
+        query = query.strip().strip('"\'`')
+        if not query or query.casefold() == 'columns':
+            return self.columns()
+        name, _, value = (part.strip().strip('"\'') for part in query.partition('='))
+        column = self._columns.get(name.casefold())
+        if column is None:
+            return {'error': f"Unknown column '{name}'", **self.columns()}
+        if not value:
+            if column in self.value_counts:
+                return {'column': column, 'rows': self.rows, 'counts': self.value_counts[column],
+                        'totals': self.group_totals.get(column, {})}
+            if column in self.numeric:
+                return {'column': column, 'describe': self.numeric[column]}
+            return {'error': f"Column '{column}' has too many distinct values to be indexed"}
+        if column not in self.value_counts:
+            return {'error': f"Column '{column}' is not indexed by value", **self.columns()}
+        key = self._values[column].get(value.casefold())
+        if key is None:
+            return {'column': column, 'value': value, 'count': 0}
+        return {'column': column, 'value': key, 'count': self.value_counts[column][key],
+                'totals': self.group_totals.get(column, {}).get(key, {})}
+
+    def as_tool(self, name: str = "claims_summary") -> Tool:
+        return Tool(
+            name=name,
+            func=lambda query: json.dumps(self.lookup(query)),
+            description=(
+                "Precomputed claim counts, totals and averages; try this before writing pandas code. "
+                "Input 'columns' to list indexed columns, a column name for its value counts (or numeric "
+                "statistics), or 'column=value' (e.g. 'claim_type=home') for the number of matching "
+                "claims and the sums/means of numeric columns over them."
+            ),
+        )
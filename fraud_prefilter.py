@@ -0,0 +1,203 @@
+"""Cheap local fraud pre-scorer that decides which claims need the LLM.
+
+USAGE:
+    python fraud_prefilter.py train claims_dataset.csv --label fraud
+    python fraud_prefilter.py score claims_dataset.csv --low 0.05 --high 0.95 --escalate escalated.csv
+    python fraud_batch.py escalated.csv --id-column row_id --drop-columns fraud
+
+A logistic regression (plain NumPy, trained on the labelled claims) scores
+every claim in one vectorized pass. Claims below ``--low`` are cleared,
+claims above ``--high`` are flagged, and only the uncertain band in between,
+plus any claim caught by a rule, is escalated to the LLM agent.
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from fraud_data import is_id_column, load_claims
+
+MAX_CATEGORIES = 50
+OUTLIER_Z = 4.0
+
+# ============================================================================
+# RULES
+# ============================================================================
+# A rule maps the claims dataframe to a boolean mask of claims that must go
+# to the LLM whatever their score.
+
+def outlier_rule(z: float = OUTLIER_Z):
+    """Escalate claims with any numeric feature more than ``z`` std devs from the mean."""
+    def rule(df, model):
+        mask = np.zeros(len(df), dtype=bool)
+        for column, (mean, std) in model.numeric.items():
+            mask |= (np.abs((df[column].to_numpy(dtype=float) - mean) / std) > z)
+        return mask
+    return rule
+
+
+DEFAULT_RULES = {'numeric_outlier': outlier_rule()}
+
+# ============================================================================
+# MODEL
+# ============================================================================
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -30, 30)))
+
+
+class FraudPrefilter:
+    """Logistic regression over standardized numeric and one-hot categorical columns."""
+
+    def __init__(self, label_column: str = "fraud", low: float = 0.05, high: float = 0.95,
+                 rules: dict = None, exclude=()):
+        self.label_column = label_column
+        self.low = low
+        self.high = high
+        self.rules = DEFAULT_RULES if rules is None else rules
+        self.exclude = set(exclude)
+        self.numeric = {}  # column -> (mean, std)
+        self.categorical = {}  # column -> categories
+        self.weights = None
+        self.bias = 0.0
+
+    # -- features --------------------------------------------------------------
+
+    def _select_columns(self, df: pd.DataFrame):
+        for column in df.columns:
+            values = df[column]
+            if column == self.label_column or column in self.exclude or is_id_column(values):
+                continue
+            if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+                std = float(values.std()) or 1.0
+                self.numeric[column] = (float(values.mean()), std)
+            elif values.nunique() <= MAX_CATEGORIES:
+                self.categorical[column] = sorted(values.dropna().astype(str).unique())
+
+    def features(self, df: pd.DataFrame) -> np.ndarray:
+        """Feature matrix (float32) for ``df`` using the fitted column spec."""
+        width = len(self.numeric) + sum(len(c) for c in self.categorical.values())
+        X = np.zeros((len(df), width), dtype=np.float32)
+        i = 0
+        for column, (mean, std) in self.numeric.items():
+            values = df[column].to_numpy(dtype=np.float32, na_value=np.nan)
+            X[:, i] = np.nan_to_num((values - mean) / std)  # missing -> mean
+            i += 1
+        for column, categories in self.categorical.items():
+            codes = pd.Categorical(df[column].astype(str), categories=categories).codes
+            known = codes >= 0
+            X[np.flatnonzero(known), i + codes[known]] = 1.0
+            i += len(categories)
+        return X
+
+    # -- training and scoring ----------------------------------------------------
+
+    def fit(self, df: pd.DataFrame, epochs: int = 300, lr: float = 0.5, l2: float = 1e-3):
+        """Full-batch gradient descent on the labelled claims."""
+        self.numeric, self.categorical = {}, {}
+        self._select_columns(df)
+        X = self.features(df)
+        y = df[self.label_column].to_numpy(dtype=np.float32)
+        self.weights = np.zeros(X.shape[1], dtype=np.float32)
+        self.bias = float(np.log((y.mean() + 1e-6) / (1 - y.mean() + 1e-6)))
+        for _ in range(epochs):
+            error = _sigmoid(X @ self.weights + self.bias) - y
+            self.weights -= lr * ((X.T @ error) / len(y) + l2 * self.weights)
+            self.bias -= lr * float(error.mean())
+        return self
+
+    def predict_proba(self, df: pd.DataFrame) -> np.ndarray:
+        return _sigmoid(self.features(df) @ self.weights + self.bias)
+
+    def score(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Score, rule hits and decision ("clean" / "fraud" / "escalate") per claim."""
+        scores = self.predict_proba(df)
+        decision = np.where(scores < self.low, "clean", np.where(scores > self.high, "fraud", "escalate"))
+        result = pd.DataFrame({'fraud_score': scores}, index=df.index)
+        for name, rule in self.rules.items():
+            hits = np.asarray(rule(df, self), dtype=bool)
+            result[f'rule_{name}'] = hits
+            decision = np.where(hits, "escalate", decision)
+        result['decision'] = decision
+        return result
+
+    # -- persistence -------------------------------------------------------------
+
+    def save(self, path="fraud_prefilter.json"):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'label_column': self.label_column,
+                'low': self.low,
+                'high': self.high,
+                'numeric': self.numeric,
+                'categorical': self.categorical,
+                'weights': self.weights.tolist(),
+                'bias': self.bias,
+            }, f, indent=1)
+
+    @classmethod
+    def load(cls, path="fraud_prefilter.json", rules: dict = None):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        model = cls(data['label_column'], data['low'], data['high'], rules)
+        model.numeric = {k: tuple(v) for k, v in data['numeric'].items()}
+        model.categorical = data['categorical']
+        model.weights = np.asarray(data['weights'], dtype=np.float32)
+        model.bias = data['bias']
+        return model
+
+
+def print_report(df: pd.DataFrame, scored: pd.DataFrame, elapsed: float, label_column: str = None):
+    counts = scored['decision'].value_counts()
+    total = len(scored)
+    print(f"⚡ Scored {total:,} claims in {elapsed:.2f}s ({total / max(elapsed, 1e-9):,.0f} claims/s)")
+    for decision, emoji in (('clean', '✅'), ('fraud', '🚩'), ('escalate', '🤖')):
+        n = int(counts.get(decision, 0))
+        print(f"{emoji} {decision}: {n:,} ({n / max(total, 1):.1%})")
+    if label_column and label_column in df.columns:
+        auto = scored['decision'] != 'escalate'
+        predicted = (scored.loc[auto, 'decision'] == 'fraud').astype(int)
+        if auto.any():
+            accuracy = (predicted == df.loc[auto, label_column].astype(int)).mean()
+            print(f"🎯 Accuracy on auto-decided claims: {accuracy:.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or run the local fraud pre-filter.")
+    parser.add_argument("mode", choices=["train", "score"])
+    parser.add_argument("csv")
+    parser.add_argument("--model", default="fraud_prefilter.json")
+    parser.add_argument("--label", default="fraud", help="Label column (0/1) used for training")
+    parser.add_argument("--exclude", default="", help="Comma-separated columns kept out of the features")
+    parser.add_argument("--low", type=float, default=0.05, help="Scores below this are cleared")
+    parser.add_argument("--high", type=float, default=0.95, help="Scores above this are flagged")
+    parser.add_argument("--escalate", default=None, help="Write escalated claims to this CSV")
+    parser.add_argument("--scores", default=None, help="Write all scores and decisions to this CSV")
+    args = parser.parse_args()
+
+    df = load_claims(args.csv)
+    if args.mode == "train":
+        start = time.perf_counter()
+        exclude = [c for c in args.exclude.split(",") if c]
+        model = FraudPrefilter(args.label, args.low, args.high, exclude=exclude).fit(df)
+        model.save(args.model)
+        print(f"🧠 Trained on {len(df):,} claims in {time.perf_counter() - start:.2f}s -> {args.model}")
+    else:
+        model = FraudPrefilter.load(args.model)
+        model.low, model.high = args.low, args.high
+
+    start = time.perf_counter()
+    scored = model.score(df)
+    print_report(df, scored, time.perf_counter() - start, args.label)
+    if args.scores:
+        scored.to_csv(args.scores, index_label='row_id')
+    if args.escalate:
+        df[scored['decision'] == 'escalate'].to_csv(args.escalate, index_label='row_id')
+        print(f"💾 Escalated claims written to {args.escalate} (row_id = row in {args.csv})")
+
+
+if __name__ == "__main__":
+    main()
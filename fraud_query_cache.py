@@ -0,0 +1,147 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+from langchain_core.callbacks import BaseCallbackHandler
+
+# ============================================================================
+# KEYS
+# ============================================================================
+
+def normalize_question(question: str) -> str:
+    """Case-fold and collapse whitespace and trailing punctuation, so rephrasings that only differ there match."""
+    return re.sub(r"[\s?.!]+$", "", " ".join(question.casefold().split()))
+
+
+def dataframe_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of ``df``: column names, dtypes and every value (one vectorized pass)."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+# ============================================================================
+# STEP RECORDER
+# ============================================================================
+
+class StepRecorder(BaseCallbackHandler):
+    """Collects the tool calls (generated code) and observations of one agent run."""
+
+    def __init__(self):
+        self.steps = []
+
+    def on_agent_action(self, action, **kwargs):
+        self.steps.append({'tool': action.tool, 'input': action.tool_input, 'observation': None})
+
+    def on_tool_end(self, output, **kwargs):
+        if self.steps and self.steps[-1]['observation'] is None:
+            self.steps[-1]['observation'] = str(output)
+
+# ============================================================================
+# QUERY CACHE
+# ============================================================================
+
+class QueryCache:
+    """SQLite memo of dataframe-agent answers keyed on (question, data fingerprint).
+
+    Each entry keeps the final answer and the steps that produced it (the
+    pandas code the model generated and what it printed). Entries for any
+    other fingerprint are dropped on open, so a changed CSV invalidates the
+    cache automatically.
+
+    Pass ``fingerprint=fraud_data.csv_fingerprint(path)`` (size/mtime, no
+    data read) for a fast start; with only ``df`` the full content hash is
+    computed instead, which costs one pass over the data.
+
+    Usage:
+        cache = QueryCache(fingerprint=csv_fingerprint("claims_dataset.csv"))
+        answer = cache.ask(agent, "What is the total number of claims related to home?")
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS answers (
+            question_key TEXT NOT NULL,
+            df_hash TEXT NOT NULL,
+            question TEXT NOT NULL,
+            steps TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            created TEXT NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (question_key, df_hash)
+        );
+    """
+
+    def __init__(self, df: pd.DataFrame = None, path="agent_query_cache.db", fingerprint: str = None):
+        if fingerprint is None:
+            if df is None:
+                raise ValueError("QueryCache needs a dataframe or a fingerprint")
+            fingerprint = dataframe_fingerprint(df)
+        self.fingerprint = fingerprint
+        self.path = Path(path)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self._SCHEMA)
+        with self._conn:
+            self._conn.execute("DELETE FROM answers WHERE df_hash != ?", (self.fingerprint,))
+
+    def get(self, question: str):
+        """Return {question, steps, answer, created} or None."""
+        key = normalize_question(question)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT question, steps, answer, created FROM answers WHERE question_key = ? AND df_hash = ?",
+                (key, self.fingerprint)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self._conn:
+                self._conn.execute("UPDATE answers SET hits = hits + 1 WHERE question_key = ? AND df_hash = ?",
+                                   (key, self.fingerprint))
+        return {'question': row[0], 'steps': json.loads(row[1]), 'answer': row[2], 'created': row[3]}
+
+    def put(self, question: str, answer: str, steps: list = ()):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (question_key, df_hash, question, steps, answer, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (normalize_question(question), self.fingerprint, question,
+                 json.dumps(list(steps), default=str), answer, datetime.now().isoformat())
+            )
+
+    def ask(self, agent, question: str, prompt: str = None) -> str:
+        """Answer from the cache, or run ``agent`` on ``prompt`` (default: the question) and store it.
+
+        Runs that stop early (iteration or time limit) are not cached.
+        """
+        cached = self.get(question)
+        if cached is not None:
+            return cached['answer']
+        recorder = StepRecorder()
+        result = agent.invoke({"input": prompt or question}, config={"callbacks": [recorder]})
+        answer = str(result["output"])
+        if not answer.startswith("Agent stopped"):
+            self.put(question, answer, recorder.steps)
+        return answer
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM answers")
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        return {'size': size, 'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,318 @@
+"""Run generated pandas code in resource-limited worker processes.
+
+The dataframe is written once to shared memory in the Arrow IPC format;
+each worker maps it (numeric columns without nulls are used zero-copy) and
+executes snippets with a CPU-time limit, an address-space limit and a
+wall-clock timeout. A worker that hangs or dies is killed and replaced, and
+the caller gets an error string back instead of a stalled agent.
+
+Usage:
+    pool = SandboxPool(df, workers=4, timeout=30)
+    install(agent, pool)   # replaces the agent's python_repl_ast tool
+    ...
+    pool.close()
+"""
+
+import ast
+import asyncio
+import atexit
+import contextlib
+import contextvars
+import io
+import multiprocessing
+import os
+import re
+import signal
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from langchain_core.tools import Tool
+
+try:
+    import resource
+except ImportError:  # not POSIX: timeouts still apply, CPU/memory limits do not
+    resource = None
+
+MAX_OUTPUT_CHARS = 4000
+
+# Explicit sandbox session for the current context (see SandboxPool.session)
+_session = contextvars.ContextVar("sandbox_session", default=None)
+
+# The description of langchain_experimental's PythonAstREPLTool, so prompts built for it still match
+TOOL_DESCRIPTION = (
+    "A Python shell. Use this to execute python commands. Input should be a valid python command. "
+    "When using this tool, sometimes output is abbreviated - make sure it does not look abbreviated "
+    "before using it in your answer."
+)
+
+# ============================================================================
+# SHARED DATAFRAME
+# ============================================================================
+
+def share_dataframe(df: pd.DataFrame) -> shared_memory.SharedMemory:
+    """Write ``df`` as an Arrow IPC stream straight into a new shared memory block."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sizer = pa.MockOutputStream()
+    with pa.ipc.new_stream(sizer, table.schema) as writer:
+        writer.write_table(table)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, sizer.size()))
+    sink = pa.FixedSizeBufferWriter(pa.py_buffer(shm.buf))
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    sink.close()
+    return shm
+
+
+def _attach_dataframe(name: str):
+    shm = shared_memory.SharedMemory(name=name)
+    table = pa.ipc.open_stream(pa.py_buffer(shm.buf)).read_all()
+    return shm, table.to_pandas(split_blocks=True)
+
+# ============================================================================
+# WORKER PROCESS
+# ============================================================================
+
+class CpuLimitExceeded(Exception):
+    pass
+
+
+def _on_sigxcpu(signum, frame):
+    raise CpuLimitExceeded("CPU time limit exceeded")
+
+
+def _vm_bytes() -> int:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+def sanitize_input(code: str) -> str:
+    """Strip markdown fences and a leading "python" the way PythonAstREPLTool does."""
+    code = re.sub(r"^(\s|`)*(?i:python)?\s*", "", code)
+    return re.sub(r"(\s|`)*$", "", code)
+
+
+def execute(code: str, namespace: dict) -> str:
+    """Run statements, then evaluate a trailing expression; returns printed output or the value."""
+    tree = ast.parse(sanitize_input(code))
+    last = tree.body.pop() if tree.body and isinstance(tree.body[-1], ast.Expr) else None
+    stdout = io.StringIO()
+    with contextlib.redirect_stdout(stdout):
+        exec(compile(tree, "<sandbox>", "exec"), namespace)
+        value = eval(compile(ast.Expression(last.value), "<sandbox>", "eval"), namespace) if last else None
+    output = stdout.getvalue()
+    if value is not None:
+        output += str(value)
+    return output[:MAX_OUTPUT_CHARS]
+
+
+def _worker_main(conn, shm_name: str, cpu_seconds: float, memory_mb: int):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C is handled by the parent
+    if hasattr(pd.options.mode, 'copy_on_write'):
+        pd.options.mode.copy_on_write = True  # snippets cannot modify the shared frame
+    shm, df = _attach_dataframe(shm_name)
+    # Like python_repl_ast, variables defined by one snippet stay visible to the next
+    namespace = {'df': df.copy(deep=False), 'pd': pd, 'np': np}
+    conn.send(None)  # ready: startup (imports under spawn) does not count against snippet timeouts
+    if resource is not None:
+        signal.signal(signal.SIGXCPU, _on_sigxcpu)
+        if memory_mb:
+            limit = _vm_bytes() + memory_mb * 2 ** 20
+            resource.setrlimit(resource.RLIMIT_AS, (limit, resource.getrlimit(resource.RLIMIT_AS)[1]))
+    while True:
+        try:
+            code = conn.recv()
+        except EOFError:
+            break
+        if resource is not None and cpu_seconds:
+            used = resource.getrusage(resource.RUSAGE_SELF)
+            soft = int(used.ru_utime + used.ru_stime + cpu_seconds) + 1
+            resource.setrlimit(resource.RLIMIT_CPU, (soft, resource.getrlimit(resource.RLIMIT_CPU)[1]))
+        try:
+            result = execute(code, namespace)
+        except MemoryError:
+            result = f"MemoryError: snippet exceeded the {memory_mb} MB memory limit"
+        except BaseException as e:
+            result = f"{type(e).__name__}: {e}"
+        conn.send(result)
+    shm.close()
+
+# ============================================================================
+# POOL
+# ============================================================================
+
+class _Worker:
+    STARTUP_TIMEOUT = 120.0
+
+    def __init__(self, context, shm_name, cpu_seconds, memory_mb):
+        self.ready = False
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child, shm_name, cpu_seconds, memory_mb),
+                                       daemon=True)
+        self.process.start()
+        child.close()
+
+    def wait_ready(self):
+        if not self.ready:
+            if not self.conn.poll(self.STARTUP_TIMEOUT):
+                raise EOFError("worker did not start")
+            self.conn.recv()
+            self.ready = True
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(1)
+        self.conn.close()
+
+
+class SandboxPool:
+    """Fixed set of worker processes sharing one read-only copy of ``df``.
+
+    Each worker keeps its own namespace across snippets, as the in-process
+    REPL tool does; calls with the same ``session`` go to the same worker, so
+    a ReAct run sees the variables it defined in earlier steps. The tool uses
+    the run that called it (the agent invocation) as its session, or the one
+    set with ``with pool.session(key):``. A restarted worker starts with a fresh
+    namespace. ``run`` is thread-safe and blocks only the calling thread, so
+    several agent calls can run snippets in parallel on different cores.
+    """
+
+    MAX_SESSIONS = 1024
+
+    def __init__(self, df: pd.DataFrame, workers: int = None, timeout: float = 30.0,
+                 cpu_seconds: float = 20.0, memory_mb: int = 2048, start_method: str = None):
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.restarts = 0
+        if start_method is None:
+            # fork after pandas/pyarrow threads have started is unsafe on macOS
+            forkable = "fork" in multiprocessing.get_all_start_methods() and sys.platform != "darwin"
+            start_method = "fork" if forkable else "spawn"
+        self._context = multiprocessing.get_context(start_method)
+        self._shm = share_dataframe(df)
+        size = workers or os.cpu_count() or 1
+        self._workers = [self._spawn() for _ in range(size)]
+        self._busy = set()  # worker slots running a snippet
+        self._sessions = {}  # session -> worker slot
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(size, thread_name_prefix="sandbox")
+        self._closed = False
+        atexit.register(self.close)
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self._context, self._shm.name, self.cpu_seconds, self.memory_mb)
+
+    def _checkout(self, session) -> int:
+        with self._cond:
+            slot = self._sessions.get(session) if session is not None else None
+            if slot is None:
+                self._cond.wait_for(lambda: len(self._busy) < len(self._workers))
+                pinned = list(self._sessions.values())
+                slot = min((i for i in range(len(self._workers)) if i not in self._busy), key=pinned.count)
+                if session is not None:
+                    if len(self._sessions) >= self.MAX_SESSIONS:
+                        self._sessions.clear()
+                    self._sessions[session] = slot
+            else:
+                self._cond.wait_for(lambda: slot not in self._busy)
+            self._busy.add(slot)
+            return slot
+
+    def _checkin(self, slot: int):
+        with self._cond:
+            self._busy.discard(slot)
+            self._cond.notify_all()
+
+    def run(self, code: str, session=None) -> str:
+        """Execute ``code`` in a worker and return its output (or an error message)."""
+        slot = self._checkout(session)
+        worker = self._workers[slot]
+        healthy = False
+        try:
+            worker.wait_ready()
+            worker.conn.send(code)
+            if worker.conn.poll(self.timeout):
+                result = worker.conn.recv()
+                healthy = True
+                return result
+            return (f"TimeoutError: snippet took longer than {self.timeout:g}s and was stopped; "
+                    "variables from earlier snippets are gone")
+        except (EOFError, OSError):
+            return ("WorkerError: the worker process died (resource limit or crash) and was restarted; "
+                    "variables from earlier snippets are gone")
+        finally:
+            # A worker that timed out, died or was interrupted may still be busy: replace it
+            if not healthy:
+                worker.kill()
+                self._workers[slot] = self._spawn()
+                with self._cond:
+                    self.restarts += 1
+            self._checkin(slot)
+
+    def submit(self, code: str, session=None):
+        """Run ``code`` in the background; returns a concurrent.futures.Future."""
+        return self._executor.submit(self.run, code, session)
+
+    @contextlib.contextmanager
+    def session(self, key):
+        """Pin every tool call made inside the block (sync or async) to the worker of ``key``."""
+        token = _session.set(key)
+        try:
+            yield
+        finally:
+            _session.reset(token)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for worker in self._workers:
+            worker.kill()
+        self._shm.close()
+        self._shm.unlink()
+
+    def as_tool(self, name: str = "python_repl_ast") -> Tool:
+        return SandboxTool(name=name, func=self.run, coroutine=self._arun, description=TOOL_DESCRIPTION, pool=self)
+
+    async def _arun(self, code: str, session=None) -> str:
+        return await asyncio.wrap_future(self.submit(code, session))
+
+
+class SandboxTool(Tool):
+    """REPL tool backed by a SandboxPool; snippets of one agent run share a worker."""
+
+    pool: Any = None
+
+    @staticmethod
+    def _session_of(run_manager):
+        session = _session.get()
+        if session is None and run_manager is not None:
+            # The agent run that called the tool: the same for every step of one invocation
+            session = run_manager.parent_run_id
+        return session
+
+    def _run(self, code: str, config=None, run_manager=None, **kwargs) -> str:
+        return self.pool.run(code, session=self._session_of(run_manager) or threading.get_ident())
+
+    async def _arun(self, code: str, config=None, run_manager=None, **kwargs) -> str:
+        return await self.pool._arun(code, session=self._session_of(run_manager))
+
+
+def install(agent, pool: SandboxPool, name: str = "python_repl_ast"):
+    """Swap the in-process Python REPL tool of a dataframe agent for ``pool``'s tool.
+
+    The replacement keeps the tool's name, so the agent's prompt is unchanged.
+    """
+    tool = pool.as_tool(name)
+    agent.tools = [tool if t.name == name else t for t in agent.tools]
+    return agent
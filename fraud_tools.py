@@ -0,0 +1,116 @@
+import json
+import operator
+import re
+
+import pandas as pd
+from langchain_core.tools import Tool
+
+# ============================================================================
+# FRAUD PERCENTAGE
+# ============================================================================
+
+_OPERATORS = {
+    '>=': operator.ge, '<=': operator.le, '!=': operator.ne,
+    '==': operator.eq, '=': operator.eq, '>': operator.gt, '<': operator.lt,
+}
+_FILTER = re.compile(r"^\s*([^<>=!]+?)\s*(>=|<=|!=|==|=|>|<)\s*(.+?)\s*$")
+_TRUE_LABELS = {'1', 'true', 'yes', 'y', 'fraud', 'fraudulent'}
+
+
+def _column(df: pd.DataFrame, name: str) -> str:
+    columns = {c.casefold(): c for c in df.columns}
+    column = columns.get(name.strip().strip('"\'`').casefold())
+    if column is None:
+        raise KeyError(f"Unknown column '{name.strip()}'")
+    return column
+
+
+def _fraud_flags(values: pd.Series) -> pd.Series:
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+        return values.fillna(0).astype(bool)
+    return values.astype(str).str.strip().str.casefold().isin(_TRUE_LABELS)
+
+
+def filter_mask(df: pd.DataFrame, filters: list) -> pd.Series:
+    """Boolean mask for ``["claim_amount > 1000", "claim_type = home"]``-style filters."""
+    mask = pd.Series(True, index=df.index)
+    for text in filters:
+        match = _FILTER.match(text)
+        if not match:
+            raise ValueError(f"Cannot parse filter '{text}' (expected: column op value)")
+        name, op, value = match.groups()
+        column = _column(df, name)
+        value = value.strip('"\'')
+        values = df[column]
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            mask &= _OPERATORS[op](values, float(value))
+        elif op in ('=', '==', '!='):
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Compare against the few categories, not every row
+                equal = values.isin([c for c in values.cat.categories if str(c).casefold() == value.casefold()])
+            else:
+                equal = values.astype(str).str.casefold() == value.casefold()
+            mask &= ~equal if op == '!=' else equal
+        else:
+            mask &= _OPERATORS[op](values.astype(str), value)
+    return mask
+
+
+def calculate_fraud_percentage(df: pd.DataFrame, label_column: str = "fraud", group_by: str = None,
+                               filters: list = None) -> dict:
+    """Share of fraudulent claims (optionally filtered, optionally per group) in one pass."""
+    label = _column(df, label_column)
+    mask = filter_mask(df, filters or [])
+    flags = _fraud_flags(df.loc[mask, label])
+    result = {
+        'claims': int(mask.sum()),
+        'fraudulent': int(flags.sum()),
+        'fraud_percentage': round(100 * flags.mean(), 2) if len(flags) else 0.0,
+    }
+    if group_by:
+        group = _column(df, group_by)
+        grouped = flags.groupby(df.loc[mask, group], observed=True).agg(['sum', 'count'])
+        result['by_' + group] = {
+            str(value): {
+                'claims': int(row['count']),
+                'fraudulent': int(row['sum']),
+                'fraud_percentage': round(100 * row['sum'] / row['count'], 2),
+            }
+            for value, row in grouped.iterrows()
+        }
+    return result
+
+
+def parse_fraud_query(query: str):
+    """Split "by claim_type where claim_amount > 1000 and region = north" into (group_by, filters)."""
+    query = query.strip().strip('"\'`')
+    head, where = query, ''
+    match = re.search(r"\bwhere\b", query, re.I)
+    if match:
+        head, where = query[:match.start()], query[match.end():]
+    head = head.strip()
+    group_by = re.sub(r"^(group(ed)?\s+)?by\s+", "", head, flags=re.I).strip() or None
+    filters = [f for f in re.split(r"\s+and\s+|,", where, flags=re.I) if f.strip()]
+    return group_by, filters
+
+
+def fraud_percentage_tool(df: pd.DataFrame, label_column: str = "fraud",
+                          name: str = "calculate_fraud_percentage") -> Tool:
+    """Deterministic single-input tool for the dataframe agent."""
+    def run(query: str) -> str:
+        try:
+            group_by, filters = parse_fraud_query(query)
+            return json.dumps(calculate_fraud_percentage(df, label_column, group_by, filters))
+        except (KeyError, ValueError) as e:
+            return f"Error: {e.args[0]}. Columns: {', '.join(map(str, df.columns))}"
+
+    return Tool(
+        name=name,
+        func=run,
+        description=(
+            f"Percentage of fraudulent claims (label column '{label_column}'), computed directly. "
+            "Input: optional 'by <column>' to break it down per value, and optional 'where' filters "
+            "joined by 'and', e.g. 'by claim_type where claim_amount > 1000 and region = north'. "
+            "Empty input gives the overall percentage."
+        ),
+    )
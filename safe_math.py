@@ -0,0 +1,198 @@
+import ast
+import functools
+import math
+import operator
+
+try:
+    import numpy as np
+except ImportError:  # array evaluation falls back to per-element loops
+    np = None
+
+# ============================================================================
+# LIMITS
+# ============================================================================
+
+MAX_EXPRESSION_LENGTH = 1000
+MAX_NODES = 200
+MAX_EXPONENT = 10_000
+MAX_INT_BITS = 10_000  # ~3000 decimal digits
+
+
+class CalculatorError(ValueError):
+    """Raised for expressions that are not allowed or exceed the limits."""
+
+# ============================================================================
+# OPERATORS AND FUNCTIONS
+# ============================================================================
+
+def _is_array(value) -> bool:
+    return np is not None and isinstance(value, np.ndarray)
+
+
+def _check_int_bits(bits: int):
+    if bits > MAX_INT_BITS:
+        raise CalculatorError(f"Result too large (over {MAX_INT_BITS} bits)")
+
+
+def _safe_mul(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        _check_int_bits(a.bit_length() + b.bit_length())
+    return a * b
+
+
+def _safe_pow(a, b):
+    if _is_array(b):
+        if b.size and np.max(np.abs(b)) > MAX_EXPONENT:
+            raise CalculatorError(f"Exponent too large (limit {MAX_EXPONENT})")
+    elif abs(b) > MAX_EXPONENT:
+        raise CalculatorError(f"Exponent too large (limit {MAX_EXPONENT})")
+    elif isinstance(a, int) and isinstance(b, int) and b > 0:
+        _check_int_bits(a.bit_length() * b)
+    result = a ** b
+    if isinstance(result, complex):
+        raise CalculatorError("Complex result (negative base with a fractional exponent)")
+    return result
+
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: _safe_mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: _safe_pow,
+}
+
+_UNARY_OPS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+CONSTANTS = {'pi': math.pi, 'e': math.e, 'tau': math.tau}
+
+MATH_FUNCTIONS = {
+    'abs': abs, 'round': round, 'min': min, 'max': max,
+    'sqrt': math.sqrt, 'exp': math.exp, 'log': math.log, 'log10': math.log10, 'log2': math.log2,
+    'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
+    'floor': math.floor, 'ceil': math.ceil,
+}
+
+if np is not None:
+    NUMPY_FUNCTIONS = {
+        'abs': np.abs, 'round': np.round,
+        'min': lambda *args: functools.reduce(np.minimum, args),
+        'max': lambda *args: functools.reduce(np.maximum, args),
+        'sqrt': np.sqrt, 'exp': np.exp, 'log': np.log, 'log10': np.log10, 'log2': np.log2,
+        'sin': np.sin, 'cos': np.cos, 'tan': np.tan,
+        'floor': np.floor, 'ceil': np.ceil,
+    }
+
+# ============================================================================
+# COMPILER
+# ============================================================================
+# Expressions are parsed once into a tree of closures; each closure takes
+# (variables, functions) so the same compiled expression serves scalar and
+# NumPy evaluation.
+
+def _compile_node(node):
+    if isinstance(node, ast.Expression):
+        return _compile_node(node.body)
+    if isinstance(node, ast.Constant):
+        value = node.value
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise CalculatorError(f"Unsupported constant: {value!r}")
+        if isinstance(value, int):
+            _check_int_bits(value.bit_length())
+        return lambda variables, functions: value
+    if isinstance(node, ast.Name):
+        name = node.id
+        if name in CONSTANTS:
+            value = CONSTANTS[name]
+            return lambda variables, functions: value
+
+        def load(variables, functions):
+            try:
+                return variables[name]
+            except KeyError:
+                raise CalculatorError(f"Unknown name: {name}") from None
+        return load
+    if isinstance(node, ast.BinOp):
+        op = _BIN_OPS.get(type(node.op))
+        if op is None:
+            raise CalculatorError(f"Unsupported operator: {type(node.op).__name__}")
+        left, right = _compile_node(node.left), _compile_node(node.right)
+        return lambda variables, functions: op(left(variables, functions), right(variables, functions))
+    if isinstance(node, ast.UnaryOp):
+        op = _UNARY_OPS.get(type(node.op))
+        if op is None:
+            raise CalculatorError(f"Unsupported operator: {type(node.op).__name__}")
+        operand = _compile_node(node.operand)
+        return lambda variables, functions: op(operand(variables, functions))
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in MATH_FUNCTIONS:
+            raise CalculatorError(f"Unsupported function: {ast.unparse(node.func)}")
+        if node.keywords:
+            raise CalculatorError("Keyword arguments are not supported")
+        name = node.func.id
+        args = [_compile_node(arg) for arg in node.args]
+        return lambda variables, functions: functions[name](*(arg(variables, functions) for arg in args))
+    raise CalculatorError(f"Unsupported expression: {type(node).__name__}")
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_expression(expression: str):
+    """Parse and validate an expression once; returns a callable(variables, functions)."""
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise CalculatorError(f"Expression too long (limit {MAX_EXPRESSION_LENGTH} characters)")
+    try:
+        tree = ast.parse(expression.strip(), mode='eval')
+    except SyntaxError as e:
+        raise CalculatorError(f"Invalid expression: {e.msg}") from None
+    if sum(1 for _ in ast.walk(tree)) > MAX_NODES:
+        raise CalculatorError(f"Expression too complex (limit {MAX_NODES} nodes)")
+    return _compile_node(tree)
+
+# ============================================================================
+# EVALUATION
+# ============================================================================
+
+def evaluate(expression: str, variables: dict = None):
+    """Safely evaluate an arithmetic expression.
+
+    ``variables`` may bind names to numbers or to sequences; sequences are
+    evaluated element-wise in one vectorized NumPy pass (or a Python loop
+    when NumPy is not installed).
+    """
+    compiled = compile_expression(expression)
+    variables = variables or {}
+    arrays = {name: value for name, value in variables.items() if isinstance(value, (list, tuple)) or _is_array(value)}
+    if not arrays:
+        return compiled(variables, MATH_FUNCTIONS)
+    if np is not None:
+        bound = {**variables, **{name: np.asarray(value, dtype=float) for name, value in arrays.items()}}
+        with np.errstate(all='raise'):
+            try:
+                return compiled(bound, NUMPY_FUNCTIONS)
+            except FloatingPointError as e:
+                raise CalculatorError(f"Invalid result: {e}") from None
+    length = len(next(iter(arrays.values())))
+    return [
+        compiled({**variables, **{name: value[i] for name, value in arrays.items()}}, MATH_FUNCTIONS)
+        for i in range(length)
+    ]
+
+
+def evaluate_batch(expressions: list, variables: dict = None) -> list:
+    """Evaluate many expressions through the compile cache.
+
+    Failed expressions yield the exception instance in their slot instead of
+    aborting the batch.
+    """
+    results = []
+    for expression in expressions:
+        try:
+            results.append(evaluate(expression, variables))
+        except (ArithmeticError, TypeError, ValueError) as e:
+            results.append(e)
+    return results
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+
+from langchain_core.tools import StructuredTool
+
+from agent_tools import TTLCache
+
+# ============================================================================
+# RATE LIMITING
+# ============================================================================
+
+class TokenBucket:
+    """Token-bucket rate limiter: ``rate`` requests per second, bursts up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.waits = 0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        """Take a token if available; otherwise return seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            self.waits += 1
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        while (wait := self._take()) > 0:
+            time.sleep(wait)
+
+    async def aacquire(self):
+        while (wait := self._take()) > 0:
+            await asyncio.sleep(wait)
+
+# ============================================================================
+# SEARCH FRONT-END
+# ============================================================================
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query for caching ("  Weather in SF? " -> "weather in sf")."""
+    return " ".join(query.casefold().split()).rstrip("?!. ")
+
+
+class SearchFrontEnd:
+    """Deduplicating, rate-limited front-end for a search tool such as TavilySearch.
+
+    - results are cached for ``ttl`` seconds under the normalized query (plus
+      any other arguments);
+    - concurrent identical searches are coalesced: one caller goes upstream
+      and the others wait for its result (single-flight);
+    - upstream calls pass through a token bucket of ``rate``/s with bursts up
+      to ``burst``.
+    ``as_tool()`` returns a tool with the wrapped tool's name, description
+    and arguments, so it can replace it in an agent's tool list.
+    """
+
+    def __init__(self, search_tool, ttl: float = 300, maxsize: int = 512,
+                 rate: float = 1.0, burst: int = 5):
+        self.search_tool = search_tool
+        self.cache = TTLCache(f"search:{search_tool.name}", ttl=ttl, maxsize=maxsize)
+        self.bucket = TokenBucket(rate, burst)
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self._inflight = {}  # key -> concurrent Future
+        self._ainflight = {}  # (event loop, key) -> asyncio Future
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(tool_input: dict):
+        extras = sorted((k, json.dumps(v, sort_keys=True)) for k, v in tool_input.items()
+                        if k != "query" and v is not None)
+        return (normalize_query(tool_input["query"]), tuple(extras))
+
+    @staticmethod
+    def _cacheable(result) -> bool:
+        return not (isinstance(result, dict) and result.get("error"))
+
+    def invoke(self, tool_input: dict):
+        """Search with caching, coalescing and rate limiting."""
+        key = self._key(tool_input)
+        state, value = self.cache.lookup(key)
+        if state == "fresh":
+            return value
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            try:
+                return future.result()
+            except CancelledError:
+                if future.cancelled():  # the leader was interrupted; take over
+                    return self.invoke(tool_input)
+                raise
+        try:
+            self.bucket.acquire()
+            self.upstream_calls += 1
+            value = self.search_tool.invoke(tool_input)
+        except BaseException as e:
+            # Unregister before resolving, so woken followers start a fresh flight
+            with self._lock:
+                self._inflight.pop(key, None)
+            if isinstance(e, Exception):
+                future.set_exception(e)
+            else:  # KeyboardInterrupt and friends: followers retry instead of hanging
+                future.cancel()
+            raise
+        if self._cacheable(value):
+            self.cache.store(key, value)
+        with self._lock:
+            self._inflight.pop(key, None)
+        future.set_result(value)
+        return value
+
+    async def ainvoke(self, tool_input: dict):
+        """Async variant of ``invoke``; coalesces callers on the same event loop."""
+        key = self._key(tool_input)
+        state, value = self.cache.lookup(key)
+        if state == "fresh":
+            return value
+        flight_key = (asyncio.get_running_loop(), key)
+        future = self._ainflight.get(flight_key)
+        if future is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if future.cancelled():  # the leader was cancelled, not us; take over
+                    return await self.ainvoke(tool_input)
+                raise
+        future = self._ainflight[flight_key] = asyncio.get_running_loop().create_future()
+        try:
+            await self.bucket.aacquire()
+            self.upstream_calls += 1
+            value = await self.search_tool.ainvoke(tool_input)
+        except BaseException as e:
+            self._ainflight.pop(flight_key, None)
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                future.exception()  # mark retrieved when nobody else is waiting
+            else:  # cancelled: followers retry instead of waiting forever
+                future.cancel()
+            raise
+        if self._cacheable(value):
+            self.cache.store(key, value)
+        self._ainflight.pop(flight_key, None)
+        future.set_result(value)
+        return value
+
+    def stats(self) -> dict:
+        return {
+            **self.cache.stats(),
+            'upstream_calls': self.upstream_calls,
+            'coalesced': self.coalesced,
+            'rate_limited_waits': self.bucket.waits,
+        }
+
+    def as_tool(self) -> StructuredTool:
+        """Expose the front-end as a tool that mirrors the wrapped search tool."""
+        def run(**kwargs):
+            return self.invoke(kwargs)
+
+        async def arun(**kwargs):
+            return await self.ainvoke(kwargs)
+
+        return StructuredTool.from_function(
+            func=run,
+            coroutine=arun,
+            name=self.search_tool.name,
+            description=self.search_tool.description,
+            args_schema=self.search_tool.args_schema,
+        )
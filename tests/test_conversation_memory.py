@@ -0,0 +1,38 @@
+import json
+
+from conversation_memory import ConversationMemory, JSONLStorage
+
+
+def _contents(memory):
+    return [m['content'] for m in memory.get_full_history()]
+
+
+def test_torn_last_line_is_cut_before_next_append(tmp_path):
+    path = tmp_path / "memory.jsonl"
+    memory = ConversationMemory(path)
+    memory.add_exchange("q1", "a1")
+    memory.close()
+
+    # Crash mid-write: a partial record without its newline
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"role": "user", "content": "q2-parti')
+
+    memory = ConversationMemory(path)
+    assert _contents(memory) == ["q1", "a1"]
+    memory.add_exchange("q2", "a2")
+    memory.close()
+
+    assert _contents(ConversationMemory(path)) == ["q1", "a1", "q2", "a2"]
+    with open(path, 'r', encoding='utf-8') as f:
+        assert [json.loads(line)['content'] for line in f] == ["q1", "a1", "q2", "a2"]
+
+
+def test_torn_last_line_is_cut_without_prior_load(tmp_path):
+    path = tmp_path / "memory.jsonl"
+    path.write_text('{"role": "user", "content": "q1"}\n{"role": "assistant", "con', encoding='utf-8')
+
+    storage = JSONLStorage(path)
+    storage.append([{'role': 'assistant', 'content': 'a1'}])
+    storage.close()
+
+    assert [m['content'] for m in JSONLStorage(path).load()] == ["q1", "a1"]
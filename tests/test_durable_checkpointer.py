@@ -0,0 +1,49 @@
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import tool
+from langgraph.prebuilt import create_react_agent
+
+from agent_replay import ScriptedChatModel
+from durable_checkpointer import PrunedSqliteSaver, retain_messages
+
+
+@tool
+def calculator(expression: str) -> str:
+    """Evaluate an arithmetic expression."""
+    return "2"
+
+
+class RecordingModel(ScriptedChatModel):
+    seen: list = []
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.seen.append(list(messages))
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+
+def _tool_call(i):
+    return AIMessage("", tool_calls=[{'name': 'calculator', 'args': {'expression': '1+1'}, 'id': f'call_{i}'}])
+
+
+def test_history_is_capped_across_turns(tmp_path):
+    model = ScriptedChatModel(responses=[_tool_call(0), AIMessage("2")])
+    agent = create_react_agent(model, [calculator], checkpointer=PrunedSqliteSaver.from_path(str(tmp_path / "c.db")),
+                               pre_model_hook=retain_messages(10))
+    config = {'configurable': {'thread_id': 't'}}
+    for i in range(5):
+        agent.invoke({'messages': f"question {i}"}, config)
+        messages = agent.get_state(config).values['messages']
+        assert len(messages) <= 10
+        assert isinstance(messages[0], HumanMessage)
+    assert messages[-4].content == "question 4"
+
+
+def test_turn_longer_than_cap_keeps_its_question(tmp_path):
+    model = RecordingModel(responses=[*(_tool_call(i) for i in range(4)), AIMessage("2")], seen=[])
+    agent = create_react_agent(model, [calculator], checkpointer=PrunedSqliteSaver.from_path(str(tmp_path / "c.db")),
+                               pre_model_hook=retain_messages(6))
+    config = {'configurable': {'thread_id': 't'}}
+    agent.invoke({'messages': "first"}, config)
+    agent.invoke({'messages': "second"}, config)
+    for messages in model.seen:
+        assert messages and isinstance(messages[0], HumanMessage)
+    assert model.seen[-1][0].content == "second"
@@ -0,0 +1,31 @@
+import asyncio
+
+import pandas as pd
+from langchain_core.runnables import RunnableLambda
+
+from fraud_sandbox import SandboxPool
+
+
+def test_concurrent_async_runs_keep_their_own_variables():
+    pool = SandboxPool(pd.DataFrame({'amount': [1.0, 2.0]}), workers=2, timeout=30)
+    tool = pool.as_tool()
+
+    async def agent_run(value, config):
+        # Two steps of one run, like a ReAct agent defining a variable and reading it back
+        await tool.ainvoke(f"result = {value!r}", config=config)
+        await asyncio.sleep(0.1)
+        return await tool.ainvoke("print(result)", config=config)
+
+    agent = RunnableLambda(agent_run)
+
+    async def scenario():
+        return await asyncio.gather(agent.ainvoke("A"), agent.ainvoke("B"))
+
+    try:
+        assert [out.strip() for out in asyncio.run(scenario())] == ["A", "B"]
+        with pool.session("thread-1"):
+            tool.invoke("x = 1")
+        with pool.session("thread-1"):
+            assert tool.invoke("print(x)").strip() == "1"
+    finally:
+        pool.close()
@@ -0,0 +1,13 @@
+import pytest
+
+import safe_math
+from safe_math import CalculatorError
+
+
+def test_negative_base_with_fractional_exponent_is_an_error():
+    with pytest.raises(CalculatorError):
+        safe_math.evaluate("(-8)**0.5")
+    with pytest.raises(CalculatorError):
+        safe_math.evaluate("x**0.5", {'x': [4, -8]})
+    assert safe_math.evaluate("(-8)**2") == 64
+    assert safe_math.evaluate("(-8.0)**-1") == -0.125
@@ -0,0 +1,29 @@
+import asyncio
+
+from langchain_core.tools import tool
+
+from search_client import SearchFrontEnd
+
+
+def test_follower_takes_over_when_leader_is_cancelled():
+    calls = []
+
+    @tool
+    async def fake_search(query: str) -> dict:
+        """Fake search."""
+        calls.append(query)
+        await asyncio.sleep(0.2)
+        return {'results': [query]}
+
+    front_end = SearchFrontEnd(fake_search, rate=100, burst=10)
+
+    async def scenario():
+        leader = asyncio.create_task(front_end.ainvoke({'query': 'weather in sf'}))
+        await asyncio.sleep(0.05)
+        follower = asyncio.create_task(front_end.ainvoke({'query': 'Weather in SF?'}))
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        return await asyncio.wait_for(follower, 2)
+
+    assert asyncio.run(scenario()) == {'results': ['Weather in SF?']}
+    assert len(calls) == 2
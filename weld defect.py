@@ -1,37 +1,41 @@
 import tensorflow as tf
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Conv2D, MaxPooling2D, Flatten, Dense
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
 import cv2
 import numpy as np
 import matplotlib.pyplot as plt
+from weld_cache import WeldImageStore
 
 # Step 1: Image Preprocessing
 img_size = (128, 128)  # Resize images to 128x128
 batch_size = 32
+validation_split = 0.2  # 20% of data for validation
+AUTOTUNE = tf.data.AUTOTUNE
 
-datagen = ImageDataGenerator(
-    rescale=1.0/255,
-    validation_split=0.2  # 20% of data for validation
-)
+# Decode and resize each image once into a memory-mapped store; later runs only process new or changed files
+store = WeldImageStore('weld_images/', 'weld_cache/', img_size)
+print(f"Image store: {store.update()}")
+class_names = store.class_names
 
-train_generator = datagen.flow_from_directory(
-    'weld_images/',
-    target_size=img_size,
-    batch_size=batch_size,
-    class_mode='categorical',
-    subset='training
 
-',
-)
+def load_batch(indices, labels):
+    images = tf.numpy_function(store.get, [indices], tf.uint8)
+    images.set_shape((None, *img_size, 3))
+    return tf.cast(images, tf.float32) / 255.0, labels
 
-validation_generator = datagen.flow_from_directory(
-    'weld_images/',
-    target_size=img_size,
-    batch_size=batch_size,
-    class_mode='categorical',
-    subset='validation',
-)
+
+def make_dataset(subset, shuffle):
+    """Shuffle slot indices, then read each batch straight from the memory-mapped store, with prefetch."""
+    indices, labels = store.split(subset, validation_split)
+    dataset = tf.data.Dataset.from_tensor_slices((indices, tf.one_hot(labels, len(class_names))))
+    if shuffle:
+        dataset = dataset.shuffle(max(1, len(indices)), reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).map(load_batch, num_parallel_calls=AUTOTUNE).prefetch(AUTOTUNE)
+
+
+train_dataset = make_dataset('training', shuffle=True)
+validation_dataset = make_dataset('validation', shuffle=False)
+print(f"Found {len(class_names)} classes: {class_names}")
 
 # Step 2: Build a CNN Model
 model = Sequential([
@@ -43,15 +47,15 @@ model = Sequential([
     MaxPooling2D(pool_size=(2, 2)),
     Flatten(),
     Dense(128, activation='relu'),
-    Dense(train_generator.num_classes, activation='softmax')
+    Dense(len(class_names), activation='softmax')
 ])
 
 model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
 
 # Step 3: Train the Model
 history = model.fit(
-    train_generator,
-    validation_data=validation_generator,
+    train_dataset,
+    validation_data=validation_dataset,
     epochs=10
 )
 
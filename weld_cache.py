@@ -0,0 +1,228 @@
+"""Preprocessed weld image store backed by a memory-mapped array.
+
+USAGE:
+    python weld_cache.py weld_images/ --store weld_cache/
+
+Every image under ``weld_images/<class>/`` is decoded and resized once into
+``weld_cache/images.u8``, an (N, height, width, 3) uint8 array opened with
+np.memmap, so training reads only the batches it touches and memory stays
+flat. ``manifest.json`` records each file's slot, class, size, mtime and
+SHA-1; ``update()`` re-decodes only new or changed files (a touched file
+with unchanged content is not re-decoded) and reuses the slots of deleted
+ones. Pixels are stored as uint8 and scaled to [0, 1] per batch by the
+loader, which is exact and keeps the store 4x smaller than float32.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+STORE_VERSION = 1
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+# ============================================================================
+# DECODING
+# ============================================================================
+
+def file_digest(path) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_image(path, img_size=(128, 128)) -> np.ndarray:
+    """Decode to RGB uint8 and resize (nearest-neighbour, like flow_from_directory)."""
+    image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError(f"Cannot decode image: {path}")
+    image = cv2.resize(image, (img_size[1], img_size[0]), interpolation=cv2.INTER_NEAREST)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+class WeldImageStore:
+    """Resized images of ``image_dir`` in a memory-mapped uint8 array under ``store_dir``."""
+
+    def __init__(self, image_dir="weld_images/", store_dir="weld_cache/", img_size=(128, 128)):
+        self.image_dir = Path(image_dir)
+        self.store_dir = Path(store_dir)
+        self.img_size = tuple(img_size)
+        self.data_path = self.store_dir / "images.u8"
+        self.manifest_path = self.store_dir / "manifest.json"
+        self.manifest = self._load_manifest()
+        self.images = self._open('r')
+
+    # -- manifest --------------------------------------------------------------
+
+    def _empty_manifest(self) -> dict:
+        return {'version': STORE_VERSION, 'img_size': list(self.img_size), 'capacity': 0, 'files': {}, 'free': []}
+
+    def _load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return self._empty_manifest()
+        if manifest.get('version') != STORE_VERSION or tuple(manifest.get('img_size', ())) != self.img_size:
+            print("⚠️  Image store was built with other settings; rebuilding")
+            return self._empty_manifest()
+        return manifest
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _open(self, mode: str):
+        capacity = self.manifest['capacity']
+        if not capacity or not self.data_path.exists():
+            return np.empty((0, *self.img_size, 3), dtype=np.uint8)
+        return np.memmap(self.data_path, dtype=np.uint8, mode=mode, shape=(capacity, *self.img_size, 3))
+
+    @property
+    def class_names(self) -> list:
+        return sorted({entry['class'] for entry in self.manifest['files'].values()})
+
+    # -- building ----------------------------------------------------------------
+
+    def _scan(self) -> dict:
+        files = {}
+        for class_dir in sorted(d for d in self.image_dir.iterdir() if d.is_dir()):
+            for path in sorted(class_dir.rglob('*')):
+                if path.suffix.lower() in IMAGE_EXTENSIONS:
+                    files[path.relative_to(self.image_dir).as_posix()] = (class_dir.name, path)
+        return files
+
+    def update(self, workers: int = 8) -> dict:
+        """Bring the store in line with ``image_dir``; returns counts of what changed."""
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        entries = self.manifest['files']
+        free = self.manifest['free']
+        stats = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+        todo = []  # (relative path, class, path, stat, digest, slot or None)
+
+        current = self._scan()
+        for rel in set(entries) - set(current):
+            free.append(entries.pop(rel)['index'])
+            stats['removed'] += 1
+        for rel, (class_name, path) in current.items():
+            stat = path.stat()
+            entry = entries.get(rel)
+            if entry and (entry['mtime_ns'], entry['size']) == (stat.st_mtime_ns, stat.st_size):
+                stats['unchanged'] += 1
+                continue
+            digest = file_digest(path)
+            if entry and entry['sha1'] == digest:
+                entry['mtime_ns'] = stat.st_mtime_ns  # touched, content unchanged
+                entry['class'] = class_name
+                stats['unchanged'] += 1
+                continue
+            todo.append((rel, class_name, path, stat, digest, entry['index'] if entry else None))
+
+        # Slots: changed files keep theirs, new files reuse freed slots, then the array grows
+        capacity = self.manifest['capacity']
+        slots = []
+        for rel, class_name, path, stat, digest, slot in todo:
+            if slot is None:
+                if free:
+                    slot = free.pop()
+                else:
+                    slot = capacity
+                    capacity += 1
+            slots.append(slot)
+        if capacity > self.manifest['capacity']:
+            frame_bytes = self.img_size[0] * self.img_size[1] * 3
+            with open(self.data_path, 'ab') as f:
+                f.truncate(capacity * frame_bytes)
+            self.manifest['capacity'] = capacity
+
+        if todo:
+            images = self._open('r+')
+            with ThreadPoolExecutor(workers) as pool:  # cv2 releases the GIL while decoding
+                decoded = pool.map(lambda item: self._try_read(item[2]), todo)
+                for (rel, class_name, path, stat, digest, old_slot), slot, image in zip(todo, slots, decoded):
+                    if image is None:
+                        stats['failed'] += 1
+                        if old_slot is None:
+                            free.append(slot)
+                        else:
+                            free.append(entries.pop(rel)['index'])
+                        continue
+                    images[slot] = image
+                    entries[rel] = {'index': slot, 'class': class_name, 'size': stat.st_size,
+                                    'mtime_ns': stat.st_mtime_ns, 'sha1': digest}
+                    stats['updated' if old_slot is not None else 'added'] += 1
+            images.flush()
+            del images
+        # The manifest is written after the pixels, so an interrupted update is redone next time
+        self._save_manifest()
+        self.images = self._open('r')
+        return stats
+
+    def _try_read(self, path):
+        try:
+            return read_image(path, self.img_size)
+        except Exception as e:
+            print(f"❌ Skipping {path}: {e}")
+            return None
+
+    # -- loading -----------------------------------------------------------------
+
+    def split(self, subset: str, validation_split: float = 0.2):
+        """(slot indices, class indices) for "training" or "validation".
+
+        Same split as ImageDataGenerator.flow_from_directory: within each
+        class the first ``validation_split`` of the sorted files are
+        validation, the rest training.
+        """
+        class_names = self.class_names
+        by_class = {name: [] for name in class_names}
+        for rel in sorted(self.manifest['files']):
+            entry = self.manifest['files'][rel]
+            by_class[entry['class']].append(entry['index'])
+        indices, labels = [], []
+        for label, name in enumerate(class_names):
+            slots = by_class[name]
+            cut = int(validation_split * len(slots))
+            slots = slots[:cut] if subset == 'validation' else slots[cut:]
+            indices += slots
+            labels += [label] * len(slots)
+        return np.asarray(indices, dtype=np.int64), np.asarray(labels, dtype=np.int64)
+
+    def get(self, indices) -> np.ndarray:
+        """uint8 images for ``indices``, read from the memmap in ascending order."""
+        indices = np.asarray(indices, dtype=np.int64)
+        order = np.argsort(indices)
+        batch = np.empty((len(indices), *self.img_size, 3), dtype=np.uint8)
+        batch[order] = self.images[indices[order]]
+        return batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or update the preprocessed weld image store.")
+    parser.add_argument("image_dir", nargs="?", default="weld_images/")
+    parser.add_argument("--store", default="weld_cache/")
+    parser.add_argument("--size", type=int, default=128, help="Images are resized to size x size")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = WeldImageStore(args.image_dir, args.store, (args.size, args.size))
+    stats = store.update()
+    print(f"🖼️  {len(store.manifest['files'])} images in {len(store.class_names)} classes "
+          f"({time.perf_counter() - start:.1f}s): {stats}")
+
+
+if __name__ == "__main__":
+    main()